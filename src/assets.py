@@ -0,0 +1,153 @@
+import asyncio
+import os
+
+import aiohttp
+import discord
+
+# Maps emoji choice to (asset variant, suffix of emoji names)
+EMOJI_VARIANTS = {
+    'Logos': ('logo', ''),
+    'Shirts': ('shirt', '_shirt'),
+    'Goalie Shirts': ('goalie', '_goalie'),
+}
+
+
+class AssetCache:
+    """
+    Team logos and shirts, downloaded concurrently and kept on disk keyed by team code and variant,
+    so they are only ever downloaded once
+    """
+
+    def __init__(self, fpl_api, directory: str = 'asset_cache', max_downloads: int = 8, request_timeout: int = 30):
+        """
+        Initialises new AssetCache
+        :param fpl_api: FplApi to find asset links with
+        :param directory: Directory to keep images in. It is created if it doesn't exist
+        :param max_downloads: Maximum number of images downloaded at once
+        :param request_timeout: Number of seconds before a download is abandoned
+        """
+        self.fpl_api = fpl_api
+        self.directory = directory
+        self.max_downloads = max_downloads
+        self.request_timeout = request_timeout
+        self.session = None
+
+        os.makedirs(directory, exist_ok=True)
+
+    def asset_url(self, team: str, variant: str) -> str:
+        """
+        Find the link to an image of a team
+        :param team: Name of team
+        :param variant: 'logo', 'shirt' or 'goalie'
+        :return: Url of image
+        """
+        if variant == 'logo':
+            return self.fpl_api.view_team_logo(team)
+        return self.fpl_api.view_team_shirt(team, is_goalie=variant == 'goalie')
+
+    def asset_path(self, team: str, variant: str) -> str:
+        """
+        Find the file an image of a team is kept in
+        :param team: Name of team
+        :param variant: 'logo', 'shirt' or 'goalie'
+        :return: Path of file
+        """
+        team_code = self.fpl_api.view_team(team)["code"]
+        extension = os.path.splitext(self.asset_url(team, variant))[1]
+        return os.path.join(self.directory, f"{team_code}_{variant}{extension}")
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_downloads)
+            timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self.session
+
+    async def get_image(self, team: str, variant: str) -> bytes:
+        """
+        Get an image of a team, from disk, or downloading it if it isn't there yet
+        :param team: Name of team
+        :param variant: 'logo', 'shirt' or 'goalie'
+        :return: Bytes of image
+        :raises aiohttp.ClientError: If the image couldn't be downloaded
+        """
+        path = self.asset_path(team, variant)
+        if os.path.exists(path):
+            return await asyncio.to_thread(read_file, path)
+
+        session = await self.get_session()
+        async with session.get(self.asset_url(team, variant), raise_for_status=True) as response:
+            image = await response.read()
+
+        # Written to a temporary file first, so a half written image is never read
+        await asyncio.to_thread(write_file, path, image)
+        return image
+
+    async def get_images(self, teams: list, variant: str) -> tuple:
+        """
+        Get images of many teams at once
+        :param teams: Names of teams
+        :param variant: 'logo', 'shirt' or 'goalie'
+        :return: Tuple of a dictionary mapping team name to image, and a list of teams whose images failed
+        """
+        results = await asyncio.gather(*(self.get_image(team, variant) for team in teams), return_exceptions=True)
+
+        images = {}
+        failed_teams = []
+        for team, result in zip(teams, results):
+            if isinstance(result, (aiohttp.ClientError, asyncio.TimeoutError, OSError)):
+                failed_teams.append(team)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                images[team] = result
+        return images, failed_teams
+
+    async def close(self):
+        """
+        Close all connections
+        """
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+
+def read_file(path: str) -> bytes:
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def write_file(path: str, data: bytes):
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(data)
+    os.replace(temporary_path, path)
+
+
+async def upload_emojis(guild: discord.Guild, images: dict, max_uploads: int = 2, max_attempts: int = 3) -> list:
+    """
+    Create custom emojis in a guild, a few at a time. Uploads that are rate limited are retried
+    after waiting as long as discord asks
+    :param guild: Guild to create emojis in
+    :param images: Dictionary mapping emoji name to image
+    :param max_uploads: Maximum number of emojis uploaded at once
+    :param max_attempts: Maximum number of times to try uploading each emoji
+    :return: List of names of emojis that couldn't be created
+    """
+    semaphore = asyncio.Semaphore(max_uploads)
+
+    async def upload(name: str, image: bytes) -> bool:
+        async with semaphore:
+            for attempt in range(max_attempts):
+                try:
+                    await guild.create_custom_emoji(name=name, image=image)
+                    return True
+                except discord.HTTPException as e:
+                    if e.status != 429 or attempt == max_attempts - 1:
+                        print(e)
+                        return False
+                    retry_after = float(e.response.headers.get('Retry-After', 1))
+                    await asyncio.sleep(retry_after)
+        return False
+
+    uploaded = await asyncio.gather(*(upload(name, image) for name, image in images.items()))
+    return [name for name, was_uploaded in zip(images, uploaded) if not was_uploaded]
@@ -0,0 +1,204 @@
+"""
+Offline benchmarks of building embeds, using fpl api responses recorded to a local archive.
+
+Benchmark with the small archive kept in benchmark_fixtures, without network access:
+    python benchmark.py
+Or record responses of the real fpl api once, with network access:
+    python benchmark.py --record
+Then benchmark with them, as often as needed:
+    python benchmark.py --archive benchmark_archive.jsonl
+
+For each case, reports the time taken to build it with empty caches and with warm ones,
+how many requests it sent to the fpl api, and the memory it allocated.
+With the kept archive, request counts are checked against those expected in benchmark_fixtures,
+exiting with an error if any case sends more requests than expected.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import tabulate
+
+from custom_embed import PlayerProfileEmbed, TeamProfileEmbed, ComparisonEmbed, FplTeamEmbed, set_fpl_api
+from fpl_api import FplApi
+from transport import RecordingTransport, ReplayTransport
+
+FIXTURES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_fixtures')
+# Small archive of responses, for manager 1 and player 1 in gameweek 12, and the request counts expected with it
+FIXTURE_ARCHIVE = os.path.join(FIXTURES_DIRECTORY, 'archive.jsonl')
+FIXTURE_EXPECTED_REQUESTS = os.path.join(FIXTURES_DIRECTORY, 'expected_requests.json')
+# Archive responses of the real fpl api are recorded to
+BENCHMARK_ARCHIVE = 'benchmark_archive.jsonl'
+
+
+def clear_caches(fpl_api: FplApi):
+    """
+    Forget every response and everything calculated from them, as if just started
+    :param fpl_api: FplApi to clear
+    """
+    fpl_api.cache.clear()
+    fpl_api.stale_cache.clear()
+    fpl_api.gameweek_data_indexes.clear()
+    fpl_api.live_scorers.clear()
+    fpl_api.league_standings_cache.clear()
+
+
+def benchmark_cases(fpl_api: FplApi, manager_id: int, player_id: int, gameweek: int) -> list:
+    """
+    Get the cases to benchmark
+    :param fpl_api: FplApi embeds are built with
+    :param manager_id: Id of fpl manager to build a team of
+    :param player_id: Id of player to build a profile of
+    :param gameweek: Gameweek to build the player profile and team for
+    :return: List of (name, async function taking no arguments)
+    """
+    home_team, away_team = fpl_api.view_teamname_list()[:2]
+
+    async def player_profile():
+        return await PlayerProfileEmbed.create(player_id, gameweek)
+
+    async def team_profile():
+        return TeamProfileEmbed(home_team)
+
+    async def comparison():
+        return ComparisonEmbed(home_team, away_team)
+
+    async def fpl_team():
+        return await FplTeamEmbed.create(manager_id, gameweek)
+
+    async def team_leaderboard():
+        # Same as the /team_leaderboard command
+        teams_in_list = [[team["team"], team['total_points'], team['total_form'], team['fpl_score']]
+                         for team in fpl_api.view_team_leaderboard()]
+        return tabulate.tabulate(teams_in_list, headers=["Team", "Total points", "Form", "Fpl Score"],
+                                 tablefmt='presto')
+
+    return [('PlayerProfileEmbed', player_profile),
+            ('TeamProfileEmbed', team_profile),
+            ('ComparisonEmbed', comparison),
+            ('FplTeamEmbed', fpl_team),
+            ('team_leaderboard', team_leaderboard)]
+
+
+async def run_case(fpl_api: FplApi, case, iterations: int) -> list:
+    """
+    Benchmark one case
+    :param fpl_api: FplApi the case uses, with a ReplayTransport
+    :param case: Async function building the embed
+    :param iterations: Number of times to build it with warm caches
+    :return: Row of results
+    """
+    # With empty caches, as for the first use after starting
+    request_counts = fpl_api.transport.request_counts
+    clear_caches(fpl_api)
+    request_counts.clear()
+    start_time = time.perf_counter()
+    await case()
+    cold_time = time.perf_counter() - start_time
+    cold_requests = sum(request_counts.values())
+
+    # With warm caches, as for most uses
+    request_counts.clear()
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        await case()
+    warm_time = (time.perf_counter() - start_time) / iterations
+    warm_requests = sum(request_counts.values()) / iterations
+
+    # Memory allocated by one warm build
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    await case()
+    after = tracemalloc.take_snapshot()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated_blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+
+    return [f'{cold_time * 1000:.2f}', cold_requests, f'{warm_time * 1000:.2f}', warm_requests,
+            f'{peak_memory / 1024:.0f}', allocated_blocks]
+
+
+def exceeded_request_counts(results: list, expected_requests: dict) -> list:
+    """
+    Find cases that sent more requests than expected
+    :param results: Rows of results, as made by main
+    :param expected_requests: Dictionary mapping case name to dictionary of 'cold' and 'warm' request counts
+    :return: List of descriptions of each count exceeded
+    """
+    exceeded = []
+    for name, _, cold_requests, _, warm_requests, *_ in results:
+        expected = expected_requests.get(name)
+        if expected is None:
+            exceeded.append(f"{name} has no expected request counts")
+            continue
+        if cold_requests > expected['cold']:
+            exceeded.append(f"{name} sent {cold_requests} requests cold, expected at most {expected['cold']}")
+        if warm_requests > expected['warm']:
+            exceeded.append(f"{name} sent {warm_requests:g} requests warm, expected at most {expected['warm']}")
+    return exceeded
+
+
+async def main(arguments) -> int:
+    """
+    Record or run the benchmarks
+    :param arguments: Parsed command line arguments
+    :return: Exit status, 1 if any case sent more requests than expected
+    """
+    if arguments.record:
+        fpl_api = FplApi(transport=RecordingTransport(arguments.archive or BENCHMARK_ARCHIVE))
+    else:
+        fpl_api = FplApi(transport=ReplayTransport(arguments.archive or FIXTURE_ARCHIVE))
+
+    set_fpl_api(fpl_api)
+
+    gameweek = arguments.gameweek or fpl_api.gameweek
+    cases = benchmark_cases(fpl_api, arguments.manager_id, arguments.player_id, gameweek)
+
+    if arguments.record:
+        for name, case in cases:
+            await case()
+        await fpl_api.close()
+        print(f"Recorded responses in {arguments.archive or BENCHMARK_ARCHIVE}")
+        return 0
+
+    results = []
+    for name, case in cases:
+        results.append([name] + await run_case(fpl_api, case, arguments.iterations))
+
+    print(tabulate.tabulate(results, headers=["Case", "Cold ms", "Cold requests", "Warm ms", "Warm requests",
+                                              "Peak KiB", "Allocated blocks"], tablefmt='presto'))
+
+    if fpl_api.transport.missing_endpoints:
+        print("Warning! Not recorded, so answered as not found:", ', '.join(sorted(fpl_api.transport.missing_endpoints)))
+
+    # Request counts depend on the archive, so are only known for the kept one
+    expected_requests_path = arguments.expected_requests or (None if arguments.archive else FIXTURE_EXPECTED_REQUESTS)
+    if expected_requests_path is None:
+        return 0
+
+    with open(expected_requests_path) as expected_requests_file:
+        exceeded = exceeded_request_counts(results, json.load(expected_requests_file))
+    for description in exceeded:
+        print("Too many requests!", description)
+    return 1 if exceeded else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark building embeds from recorded fpl api responses")
+    parser.add_argument('--record', action='store_true',
+                        help="Download and record the responses the benchmarks need, instead of benchmarking")
+    parser.add_argument('--archive', help=f"Archive of recorded responses. Recorded to {BENCHMARK_ARCHIVE} "
+                                          f"and replayed from the one in benchmark_fixtures if not given")
+    parser.add_argument('--expected-requests',
+                        help="Json file of the most requests each case may send, cold and warm. "
+                             "The one in benchmark_fixtures if not given and replaying the archive there")
+    parser.add_argument('--iterations', type=int, default=100, help="Number of builds with warm caches")
+    parser.add_argument('--manager-id', type=int, default=1, help="Id of fpl manager to build a team of")
+    parser.add_argument('--player-id', type=int, default=1, help="Id of player to build a profile of")
+    parser.add_argument('--gameweek', type=int, default=0, help="Gameweek to build for, current if not given")
+
+    sys.exit(asyncio.run(main(parser.parse_args())))
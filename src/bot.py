@@ -1,29 +1,61 @@
+import asyncio
+import multiprocessing
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 
 import discord
-import requests
 from discord.ext import commands
 from discord.ext.commands import has_permissions
 from discord_slash import SlashCommand, SlashContext, ButtonStyle, client, ComponentContext
 from discord_slash.utils.manage_commands import create_choice
 
 from datetime import datetime
-from difflib import get_close_matches
 
-from discord_slash.utils.manage_components import create_select, create_select_option, create_actionrow, \
-    wait_for_component, create_button
+from discord_slash.utils.manage_components import create_select, create_select_option, create_actionrow, create_button
 
-from fpl_api import FplApi
+from fpl_api import FplApi, FplApiUnavailable, GAMEWEEK_COUNT
 from database import FplDatabase
+from manager_refresher import ManagerRefresher
+from assets import AssetCache, EMOJI_VARIANTS, upload_emojis
+from metrics import Metrics
+from transport import transport_from_environment
+from pagination import PaginationSessionManager, SessionExpired, disable_components
 
 import tabulate
 
-fplDatabase = FplDatabase()
-fplApi = FplApi()
-
+# Everything is made only when run as the bot. Transfer search workers import this file too,
+# and must not make their own database, api or workers
 if __name__ == '__main__':
-    from custom_embed import PlayerProfileEmbed, TeamProfileEmbed, ComparisonEmbed, FplTeamEmbed
-    bot = commands.Bot(command_prefix="your mother", help_command=None)
+    # Starts from the last snapshot of the data in the database, so the fpl api is only needed the first time
+    fplDatabase = FplDatabase()
+    fplMetrics = Metrics()
+    # Set FPL_TRANSPORT to record responses, or replay them without the fpl api. See transport_from_environment
+    fplApi = FplApi(database=fplDatabase, metrics=fplMetrics, transport=transport_from_environment())
+    paginationSessions = PaginationSessionManager()
+    managerRefresher = ManagerRefresher(fplApi, fplDatabase)
+    assetCache = AssetCache(fplApi)
+    # Transfer searches are cpu bound, so run in other processes to keep the event loop free.
+    # Workers are spawned rather than forked from this process, which has threads running by then
+    transferSearchExecutor = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+
+    fplMetrics.add_gauges('fpl_api', fplApi.stats, 'Fpl api requests and updates')
+    fplMetrics.add_gauges('fpl_api_cache', fplApi.cache.stats, 'Fpl api response cache')
+    fplMetrics.add_gauges('league_standings_cache', fplApi.league_standings_cache.stats, 'Full league standings cache')
+    fplMetrics.add_gauges('pagination_sessions', paginationSessions.stats, 'Pagination sessions')
+    fplMetrics.add_gauges('manager_refresher', managerRefresher.stats, 'Background refreshes of registered managers')
+
+    from custom_embed import PlayerProfileEmbed, TeamProfileEmbed, ComparisonEmbed, FplTeamEmbed, \
+        LeagueStandingsEmbed, warm_render_cache, render_cache, set_fpl_api
+    set_fpl_api(fplApi)
+    class FplBot(commands.Bot):
+        async def close(self):
+            # Closed while the event loop is still running, as their connections need it
+            await fplApi.close()
+            await assetCache.close()
+            await super().close()
+
+
+    bot = FplBot(command_prefix="your mother", help_command=None)
     slash = SlashCommand(bot, sync_commands=True, sync_on_cog_reload=True)
 
     # Open discordKey.txt and extract discord bot key
@@ -34,6 +66,30 @@ if __name__ == '__main__':
     team_list = fplApi.view_teamname_list()
 
 
+    async def send_code_block(ctx: SlashContext, text: str, hidden: bool = False):
+        """
+        Send text in a code block. Messages are limited to 2000 characters, so long text is split between lines
+        :param ctx: Context to send with
+        :param text: Text to send
+        :param hidden: Only show to the user of the command
+        """
+        message = ''
+        for line in text.split('\n'):
+            if len(message) + len(line) > 1990:
+                await ctx.send('```' + message + '```', hidden=hidden)
+                message = ''
+            message += line + '\n'
+        await ctx.send('```' + message + '```', hidden=hidden)
+
+    # Rebuild team profiles as soon as data is updated
+    warm_render_cache()
+    fplApi.update_callbacks.append(warm_render_cache)
+
+    # Export metrics for prometheus after every update
+    fplMetrics.add_gauges('render_cache', render_cache.stats, 'Built embed cache')
+    fplApi.update_callbacks.append(fplMetrics.write_prometheus_file)
+
+
     # When the bot is ready
     # Print out that it is ready with datetime it was logged in on
     @bot.listen('on_ready')
@@ -41,7 +97,8 @@ if __name__ == '__main__':
         time_info = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
         print(f'We have logged in as {bot.user.name} on {time_info}')
 
-        await fplApi.regular_updater()
+        # Updates straight away if started from a snapshot
+        await fplApi.regular_updater(manager_refresher=managerRefresher)
 
 
     @slash.slash(
@@ -57,9 +114,10 @@ if __name__ == '__main__':
             }
         ]
     )
+    @fplMetrics.timed_command
     async def team_info(ctx: SlashContext, team_name: str = team_list[0]):
         await ctx.defer()
-        await ctx.send(embed=TeamProfileEmbed(team_name))
+        await ctx.send(embed=TeamProfileEmbed.cached(team_name))
 
 
     @slash.slash(
@@ -74,6 +132,7 @@ if __name__ == '__main__':
             }
         ]
     )
+    @fplMetrics.timed_command
     async def player_info(ctx: SlashContext, player_last_name: str):
         def create_buttons(is_first_gameweek, is_last_gameweek):
             return [
@@ -91,42 +150,32 @@ if __name__ == '__main__':
                 ),
             ]
 
-        gameweek = fplApi.gameweek
+        # Searching is fast, but fetching the first profile may not be
+        await ctx.defer()
 
-        # Get list of all "web names"
-        all_web_names = list(fplApi.playername_id_dict.values())
+        gameweek = fplApi.gameweek
 
-        # Find most similar names
-        similar_names = get_close_matches(player_last_name, all_web_names, n=20)
+        # Find players with most similar names
+        player_ids = fplApi.search_players(player_last_name, limit=20)
 
-        if len(similar_names) == 0:
+        if len(player_ids) == 0:
             await ctx.send("No search results!")
             return
 
-        player_ids = []
-
-        # Go through list and get each players' id
-        for key in fplApi.playername_id_dict:
-            if fplApi.playername_id_dict[key] in similar_names:
-                player_ids.append(key)
-
-        player_dicts = []
-
-        # Go through and get all player details
-        for player_id in player_ids:
-            player_dicts.append(fplApi.view_player(player_id))
+        # Search results only need the bootstrap data
+        player_dicts = [fplApi.view_player(player_id, no_api=True) for player_id in player_ids]
 
         random_id = str(uuid.uuid1())
 
-        current_player = player_dicts[0]
         current_player_id = player_ids[0]
+        current_player = await fplApi.view_player_async(current_player_id)
 
         # Create select allowing user to grow through search results
         select = create_select(
             [create_select_option(label=player["web_name"],
                                   description=player["full_name"],
-                                  value=str(player_dicts.index(player)))
-             for player in player_dicts],
+                                  value=str(i))
+             for i, player in enumerate(player_dicts)],
             placeholder="Choose player",
             min_values=1,
             max_values=1,
@@ -140,47 +189,70 @@ if __name__ == '__main__':
 
         actionrow = create_actionrow(select)
         button_row = create_actionrow(*buttons)
-        await ctx.send(embed=PlayerProfileEmbed(current_player_id, gameweek), components=[actionrow, button_row])
-
-        while True:
-            component_ctx: ComponentContext = await wait_for_component(bot, components=[actionrow, button_row])
 
-            if component_ctx.custom_id == "select" + random_id:
-                selected_items_list_position = component_ctx.selected_options[0]
-                current_player_id = player_ids[int(selected_items_list_position)]
-                current_player = player_dicts[int(selected_items_list_position)]
-                await component_ctx.edit_origin(embed=PlayerProfileEmbed(current_player_id, gameweek))
-
-            elif component_ctx.custom_id == "Next" + random_id:
-                gameweek += 1
-
-                buttons = create_buttons(gameweek == current_player["first_gameweek"],
-                                         gameweek == fplApi.gameweek)
-                button_row = create_actionrow(*buttons)
-                await component_ctx.edit_origin(embed=PlayerProfileEmbed(current_player_id, gameweek),
-                                                components=[actionrow, button_row])
-
-            elif component_ctx.custom_id == "Previous" + random_id:
-                gameweek -= 1
-
-                buttons = create_buttons(gameweek == current_player["first_gameweek"],
-                                         gameweek == fplApi.gameweek)
-                button_row = create_actionrow(*buttons)
-                await component_ctx.edit_origin(embed=PlayerProfileEmbed(current_player_id, gameweek),
-                                                components=[actionrow, button_row])
+        def prefetch_adjacent_gameweeks():
+            # The next click is most likely Previous or Next, so start building those pages now
+            if gameweek > current_player["first_gameweek"]:
+                session.prefetch((current_player_id, gameweek - 1),
+                                 PlayerProfileEmbed.create, current_player_id, gameweek - 1)
+            if gameweek < fplApi.gameweek:
+                session.prefetch((current_player_id, gameweek + 1),
+                                 PlayerProfileEmbed.create, current_player_id, gameweek + 1)
+
+        session = paginationSessions.open()
+        try:
+            message = await ctx.send(embed=await PlayerProfileEmbed.create(current_player_id, gameweek),
+                                     components=[actionrow, button_row])
+            prefetch_adjacent_gameweeks()
+
+            while True:
+                component_ctx: ComponentContext = await session.wait_for_component(bot, [actionrow, button_row])
+
+                if component_ctx.custom_id == "select" + random_id:
+                    selected_items_list_position = component_ctx.selected_options[0]
+                    current_player_id = player_ids[int(selected_items_list_position)]
+                    current_player = await fplApi.view_player_async(current_player_id)
+                    await component_ctx.edit_origin(embed=await session.get((current_player_id, gameweek),
+                                                                            PlayerProfileEmbed.create,
+                                                                            current_player_id, gameweek))
+
+                elif component_ctx.custom_id == "Next" + random_id:
+                    gameweek += 1
+
+                    buttons = create_buttons(gameweek == current_player["first_gameweek"],
+                                             gameweek == fplApi.gameweek)
+                    button_row = create_actionrow(*buttons)
+                    await component_ctx.edit_origin(embed=await session.get((current_player_id, gameweek),
+                                                                            PlayerProfileEmbed.create,
+                                                                            current_player_id, gameweek),
+                                                    components=[actionrow, button_row])
+
+                elif component_ctx.custom_id == "Previous" + random_id:
+                    gameweek -= 1
+
+                    buttons = create_buttons(gameweek == current_player["first_gameweek"],
+                                             gameweek == fplApi.gameweek)
+                    button_row = create_actionrow(*buttons)
+                    await component_ctx.edit_origin(embed=await session.get((current_player_id, gameweek),
+                                                                            PlayerProfileEmbed.create,
+                                                                            current_player_id, gameweek),
+                                                    components=[actionrow, button_row])
+
+                prefetch_adjacent_gameweeks()
+        except SessionExpired:
+            await message.edit(components=disable_components([actionrow, button_row]))
+        finally:
+            paginationSessions.close(session)
 
     @slash.slash(
         name="team_leaderboard",
         description="Get a leaderboard of the best teams for fpl at the moment",
 
     )
+    @fplMetrics.timed_command
     async def team_leaderboard(ctx: SlashContext):
         await ctx.defer()
-        teams = []
-        for team in team_list:
-            teams.append(fplApi.view_team_fpl_score(team))
-
-        teams = sorted(teams, key=lambda d: float(d['fpl_score']), reverse=True)
+        teams = fplApi.view_team_leaderboard()
         teams_in_list = []
         for i, team in enumerate(teams):
             teams_in_list.append([team["team"], team['total_points'], team['total_form'], team['fpl_score']])
@@ -188,6 +260,109 @@ if __name__ == '__main__':
         leaderboard = tabulate.tabulate(teams_in_list, headers=["Team", "Total points", "Form", "Fpl Score"], tablefmt='presto')
         await ctx.send('```' + leaderboard + '```')
 
+    @slash.slash(
+        name="top_players",
+        description="View the best players by any stat",
+        options=[
+            {
+                "name": "stat",
+                "description": "Stat to rank players by",
+                "required": True,
+                "type": 3,
+                "choices": [
+                    create_choice(name="Form", value="form"),
+                    create_choice(name="Total Points", value="total_points"),
+                    create_choice(name="Points per Match", value="points_per_game"),
+                    create_choice(name="Form Value", value="value_form"),
+                    create_choice(name="Value For Season", value="value_season"),
+                    create_choice(name="Selected By", value="selected_by_percent"),
+                    create_choice(name="ICT Index", value="ict_index")
+                ]
+            },
+            {
+                "name": "position",
+                "description": "Position to pick from",
+                "required": False,
+                "type": 3,
+                "choices": [
+                    create_choice(name="Goalkeepers", value="GKP"),
+                    create_choice(name="Defenders", value="DEF"),
+                    create_choice(name="Midfielders", value="MID"),
+                    create_choice(name="Forwards", value="FWD")
+                ]
+            },
+            {
+                "name": "max_cost",
+                "description": "Maximum cost, in millions",
+                "required": False,
+                "type": 10
+            }
+        ]
+    )
+    @fplMetrics.timed_command
+    async def top_players(ctx: SlashContext, stat: str, position: str = None, max_cost: float = None):
+        players = fplApi.view_top_players(stat, position=position, max_cost=max_cost, limit=10)
+
+        players_in_list = []
+        for player in players:
+            team = fplApi.view_team(player["team"] - 1)
+            players_in_list.append([player["web_name"], team["short_name"],
+                                    f'£{player["now_cost"] / 10:.1f}', player[stat]])
+
+        table = tabulate.tabulate(players_in_list, headers=["Player", "Team", "Cost", stat.replace('_', ' ').title()],
+                                  tablefmt='presto')
+        await ctx.send('```' + table + '```')
+
+    @slash.slash(
+        name="fixture_planner",
+        description="Find the teams with the easiest fixtures over the next few gameweeks",
+        options=[
+            {
+                "name": "gameweeks",
+                "description": "Number of gameweeks to look at",
+                "required": False,
+                "type": 4,
+                "choices": [create_choice(name=str(gameweeks), value=gameweeks) for gameweeks in range(1, 9)]
+            },
+            {
+                "name": "start_gameweek",
+                "description": "First gameweek to look at, the next gameweek if not given",
+                "required": False,
+                "type": 4
+            }
+        ]
+    )
+    @fplMetrics.timed_command
+    async def fixture_planner(ctx: SlashContext, gameweeks: int = 5, start_gameweek: int = 0):
+        if start_gameweek and not 1 <= start_gameweek <= GAMEWEEK_COUNT:
+            await ctx.send(f"Warning, gameweek must be between 1 and {GAMEWEEK_COUNT}.", hidden=True)
+            return
+
+        planner = fplApi.view_easiest_fixture_runs(start_gameweek, gameweeks)
+        gameweek_range = range(planner['start_gameweek'], planner['end_gameweek'] + 1)
+
+        runs_in_list = []
+        for run in planner['runs']:
+            runs_in_list.append([run['team']['short_name'], f"{run['ease']:.1f}"] +
+                                [' '.join(opponents) or '-' for opponents in run['opponents']])
+
+        table = tabulate.tabulate(runs_in_list, headers=["Team", "Ease"] + [f"GW{gameweek}" for gameweek in gameweek_range],
+                                  tablefmt='presto')
+
+        # Point out blank and double gameweeks, as they matter most
+        notes = []
+        for gameweek, teams in fplApi.fixture_difficulty.blank_and_double_gameweeks().items():
+            if gameweek in gameweek_range:
+                for kind in ('blank', 'double'):
+                    if teams[kind]:
+                        team_names = ', '.join(fplApi.team_by_id[team_id]['short_name'] for team_id in teams[kind])
+                        notes.append(f"GW{gameweek} {kind}: {team_names}")
+
+        text = table + "\n\nHome opponents in capitals, away in lower case. Higher ease is easier."
+        if notes:
+            text += '\n' + '\n'.join(notes)
+        await send_code_block(ctx, text)
+
     @slash.slash(
         name="compare",
         description="Compare two teams",
@@ -208,8 +383,9 @@ if __name__ == '__main__':
             }
         ]
     )
+    @fplMetrics.timed_command
     async def compare(ctx: SlashContext, home_team: str, away_team: str):
-        await ctx.send(embed=ComparisonEmbed(home_team, away_team))
+        await ctx.send(embed=ComparisonEmbed.cached(home_team, away_team))
 
     # Check non-emoji maker, and make sure enough emoji slots
     @slash.slash(
@@ -230,38 +406,43 @@ if __name__ == '__main__':
         ]
     )
     @has_permissions(manage_emojis=True)
+    @fplMetrics.timed_command
     async def generate_emojis(ctx: SlashContext, emoji_choice: str):
+        variant, name_suffix = EMOJI_VARIANTS[emoji_choice]
+        emoji_names = {team: team.replace(' ', '_') + name_suffix for team in team_list}
+
+        # Emojis made by an earlier, interrupted run are kept
+        existing_emoji_names = {emoji.name for emoji in ctx.guild.emojis}
+        missing_teams = [team for team in team_list if emoji_names[team] not in existing_emoji_names]
+
+        if not missing_teams:
+            await ctx.send("All of these emojis already exist!", hidden=True)
+            return
+
         emoji_count = 0
         for emoji in ctx.guild.emojis:
             if not emoji.animated:
                 emoji_count += 1
 
-        if ctx.guild.emoji_limit - emoji_count < 20:
-            await ctx.send("Warning you need 20 emoji slots for this", hidden=True)
+        if ctx.guild.emoji_limit - emoji_count < len(missing_teams):
+            await ctx.send(f"Warning you need {len(missing_teams)} emoji slots for this", hidden=True)
             return
 
         await ctx.defer()
 
-        if emoji_choice == "Logos":
-            for team in team_list:
-                image = requests.get(fplApi.view_team_logo(team)).content
-                team = team.replace(' ', '_')
-                await ctx.guild.create_custom_emoji(name=team, image=image)
-        elif emoji_choice == "Shirts":
-            for team in team_list:
-                image = requests.get(fplApi.view_team_shirt(team)).content
-                team = team.replace(' ', '_')
-                try:
-                    await ctx.guild.create_custom_emoji(name=team + "_shirt", image=image)
-                except Exception as e:
-                    print(e)
-        elif emoji_choice == "Goalie Shirts":
-            for team in team_list:
-                image = requests.get(fplApi.view_team_shirt(team, is_goalie=True)).content
-                team = team.replace(' ', '_')
-                await ctx.guild.create_custom_emoji(name=team + "_goalie", image=image)
-
-        await ctx.send("Emojis succesfully generated!")
+        images, download_failures = await assetCache.get_images(missing_teams, variant)
+        upload_failures = await upload_emojis(ctx.guild, {emoji_names[team]: image for team, image in images.items()})
+
+        created_count = len(images) - len(upload_failures)
+        report = f"Emojis generated! Created {created_count}, " \
+                 f"{len(team_list) - len(missing_teams)} already existed."
+        if download_failures:
+            report += f"\nCouldn't download: {', '.join(download_failures)}"
+        if upload_failures:
+            report += f"\nCouldn't upload: {', '.join(upload_failures)}"
+        if download_failures or upload_failures:
+            report += "\nRun again to retry just these."
+        await ctx.send(report)
 
     @generate_emojis.error
     async def generate_emojis_error(ctx, error):
@@ -277,6 +458,7 @@ if __name__ == '__main__':
                   "type":4,
                   }]
     )
+    @fplMetrics.timed_command
     async def fantasy_team(ctx: SlashContext, manager_id: int = 0):
 
         if not manager_id:
@@ -284,7 +466,7 @@ if __name__ == '__main__':
             if not manager_id:
                 await ctx.send("No id sent or stored in database!")
                 return
-        profile = fplApi.get_fpl_manager(manager_id)
+        profile = await fplApi.get_fpl_manager_async(manager_id)
         def create_buttons(is_first_gameweek, is_last_gameweek):
             return [
                 create_button(
@@ -311,23 +493,165 @@ if __name__ == '__main__':
         buttons = create_buttons(current_gameweek==profile['started_event'], current_gameweek==fplApi.gameweek)
         button_row = create_actionrow(*buttons)
         await ctx.defer()
-        message = await ctx.send(embed=FplTeamEmbed(manager_id, current_gameweek), components=[button_row])
 
-        while True:
-            component_ctx: ComponentContext = await wait_for_component(bot, components=button_row)
-            if component_ctx.custom_id == "Next" + random_id:
-                current_gameweek+=1
-            elif component_ctx.custom_id == "Previous" + random_id:
-                current_gameweek-=1
-            await component_ctx.defer(edit_origin=True)
+        def prefetch_adjacent_gameweeks():
+            # The next click is most likely Previous or Next, so start building those pages now
+            if current_gameweek > profile['started_event']:
+                session.prefetch(current_gameweek - 1, FplTeamEmbed.create, manager_id, current_gameweek - 1)
+            if current_gameweek < fplApi.gameweek:
+                session.prefetch(current_gameweek + 1, FplTeamEmbed.create, manager_id, current_gameweek + 1)
+
+        session = paginationSessions.open()
+        try:
+            message = await ctx.send(embed=await FplTeamEmbed.create(manager_id, current_gameweek),
+                                     components=[button_row])
+            prefetch_adjacent_gameweeks()
+
+            while True:
+                component_ctx: ComponentContext = await session.wait_for_component(bot, [button_row])
+                if component_ctx.custom_id == "Next" + random_id:
+                    current_gameweek+=1
+                elif component_ctx.custom_id == "Previous" + random_id:
+                    current_gameweek-=1
+                await component_ctx.defer(edit_origin=True)
+
+                buttons = create_buttons(True, True)
+                button_row = create_actionrow(*buttons)
+                await component_ctx.edit_origin(components=[button_row])
 
-            buttons = create_buttons(True, True)
-            button_row = create_actionrow(*buttons)
-            await component_ctx.edit_origin(components=[button_row])
+                buttons = create_buttons(current_gameweek == profile['started_event'], current_gameweek == fplApi.gameweek)
+                button_row = create_actionrow(*buttons)
+                await message.edit(embed=await session.get(current_gameweek, FplTeamEmbed.create,
+                                                           manager_id, current_gameweek),
+                                   components=[button_row])
+                prefetch_adjacent_gameweeks()
+        except SessionExpired:
+            await message.edit(components=disable_components([button_row]))
+        finally:
+            paginationSessions.close(session)
 
-            buttons = create_buttons(current_gameweek == profile['started_event'], current_gameweek == fplApi.gameweek)
-            button_row = create_actionrow(*buttons)
-            await message.edit(embed=FplTeamEmbed(manager_id, current_gameweek), components=[button_row])
+    @slash.slash(
+        name="suggest_transfers",
+        description="Suggest the best one or two transfers for an fpl team, over the next five gameweeks",
+        options=[
+            {
+                "name": "manager_id",
+                "description": "Id of fpl manager, your stored id if not given",
+                "required": False,
+                "type": 4
+            },
+            {
+                "name": "free_transfers",
+                "description": "Number of free transfers you have",
+                "required": False,
+                "type": 4,
+                "choices": [create_choice(name=str(free_transfers), value=free_transfers)
+                            for free_transfers in range(0, 6)]
+            }
+        ]
+    )
+    @fplMetrics.timed_command
+    async def suggest_transfers(ctx: SlashContext, manager_id: int = 0, free_transfers: int = 1):
+        if not manager_id:
+            manager_id = fplDatabase.find_fpl_id(discord_id=ctx.author.id)
+            if not manager_id:
+                await ctx.send("No id sent or stored in database!")
+                return
+
+        await ctx.defer()
+        advice = await fplApi.view_transfer_suggestions_async(manager_id, free_transfers,
+                                                              executor=transferSearchExecutor)
+
+        if not advice:
+            await ctx.send("Warning, fpl team not found.")
+            return
+        if not advice['suggestions']:
+            await ctx.send("No transfers found that would gain points. Save your transfer!")
+            return
+
+        def describe(player_id):
+            player = fplApi.player_by_id[player_id]
+            return f"{player['web_name']} (£{player['now_cost'] / 10:.1f}m, " \
+                   f"{advice['projected_points'][player_id]:.1f} pts)"
+
+        lines = [f"Projected over gameweeks {advice['start_gameweek']}-{advice['end_gameweek']}, "
+                 f"with £{advice['bank'] / 10:.1f}m in the bank and {free_transfers} free transfer(s):"]
+        for i, suggestion in enumerate(advice['suggestions']):
+            transfers = ', '.join(f"{describe(player_out)} ➡ {describe(player_in)}"
+                                  for player_out, player_in in zip(suggestion['out'], suggestion['in']))
+            hit = f" after a -{suggestion['hit']} hit" if suggestion['hit'] else ''
+            lines.append(f"**{i + 1}.** {transfers}: +{suggestion['net_gain']:.1f} pts{hit}")
+
+        await ctx.send('\n'.join(lines))
+
+    @slash.slash(
+        name="league",
+        description="View standings of a classic league. Find its id in the url of the league on fpl.",
+        options=[{"name": "league_id",
+                  "description": "Id of classic league",
+                  "required": True,
+                  "type": 4,
+                  }]
+    )
+    @fplMetrics.timed_command
+    async def league(ctx: SlashContext, league_id: int):
+        def create_buttons(is_first_page, is_last_page):
+            return [
+                create_button(
+                    style=ButtonStyle.blue,
+                    label='⬅ ️Previous Page',
+                    custom_id="Previous" + random_id,
+                    disabled=is_first_page
+                ),
+                create_button(
+                    style=ButtonStyle.blue,
+                    label='Next Page ➡',
+                    custom_id="Next" + random_id,
+                    disabled=is_last_page
+                ),
+            ]
+
+        # Big leagues have many pages to download
+        await ctx.defer()
+        try:
+            league_standings = await fplApi.view_league_standings_async(league_id)
+        except FplApiUnavailable:
+            await ctx.send("Warning, couldn't download the league from fpl. Try again later.")
+            return
+
+        if 'standings' not in league_standings:
+            await ctx.send("Warning, league not found. Only classic leagues can be viewed.")
+            return
+
+        async def create_embed(page):
+            # Managers on the page are scored live together
+            entries = [result['entry'] for result in league_standings['standings'][page * 25:(page + 1) * 25]]
+            return LeagueStandingsEmbed(league_standings, page, await fplApi.view_live_scores_async(entries))
+
+        random_id = str(uuid.uuid1())
+        page = 0
+        last_page = max(0, (len(league_standings['standings']) - 1) // 25)
+
+        button_row = create_actionrow(*create_buttons(True, page == last_page))
+        message = await ctx.send(embed=await create_embed(page), components=[button_row])
+
+        session = paginationSessions.open()
+        try:
+            while True:
+                component_ctx: ComponentContext = await session.wait_for_component(bot, [button_row])
+                if component_ctx.custom_id == "Next" + random_id:
+                    page += 1
+                elif component_ctx.custom_id == "Previous" + random_id:
+                    page -= 1
+
+                # Scoring a page can take longer than discord waits for a reply
+                await component_ctx.defer(edit_origin=True)
+                button_row = create_actionrow(*create_buttons(page == 0, page == last_page))
+                await component_ctx.edit_origin(embed=await create_embed(page), components=[button_row])
+        except SessionExpired:
+            await message.edit(components=disable_components([button_row]))
+        finally:
+            paginationSessions.close(session)
 
     @slash.slash(
         name="set_fpl_id",
@@ -338,8 +662,43 @@ if __name__ == '__main__':
                   "type": 4,
                   }]
     )
+    @fplMetrics.timed_command
     async def set_fpl_id(ctx: SlashContext, fpl_id: int):
         fplDatabase.set_fpl_id(discord_id=ctx.author.id, fpl_id=fpl_id)
         await ctx.send("Id Set Correctly! Try /fantasy_team !")
 
-    bot.run(DISCORD_KEY)
\ No newline at end of file
+    @slash.slash(
+        name="stats",
+        description="View bot performance stats. Must have administrator permission."
+    )
+    @has_permissions(administrator=True)
+    async def stats(ctx: SlashContext):
+        latencies_in_list = []
+        for name, histograms in fplMetrics.histograms.items():
+            for label, histogram in sorted(histograms.items()):
+                summary = histogram.summary()
+                latencies_in_list.append([label, summary['count'], f"{summary['mean'] * 1000:.0f}",
+                                          f"≤{summary['p50'] * 1000:.0f}", f"≤{summary['p95'] * 1000:.0f}"])
+
+        gauges_in_list = []
+        for prefix, gauges in fplMetrics.gauges().items():
+            for key, value in gauges.items():
+                gauges_in_list.append([prefix, key, f'{value:g}'])
+
+        latencies = tabulate.tabulate(latencies_in_list, headers=["Latency", "Count", "Mean ms", "P50 ms", "P95 ms"],
+                                      tablefmt='presto')
+        gauges = tabulate.tabulate(gauges_in_list, headers=["Component", "Stat", "Value"], tablefmt='presto')
+
+        await send_code_block(ctx, latencies, hidden=True)
+        await send_code_block(ctx, gauges, hidden=True)
+
+    @stats.error
+    async def stats_error(ctx, error):
+        if isinstance(error, commands.MissingPermissions):
+            await ctx.send("Warning! You need the administrator permission for this.", hidden=True)
+
+    bot.run(DISCORD_KEY)
+
+    # Write anything still waiting to be written
+    fplDatabase.close()
+    transferSearchExecutor.shutdown()
@@ -0,0 +1,102 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class ResponseCache:
+    """
+    A bounded cache for fpl api responses.
+    Each entry has its own time to live, or lives until it is evicted if it never expires.
+    Once full, the least recently used entry is evicted first
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Initialises new, empty ResponseCache
+        :param max_entries: Maximum number of responses to store at once
+        """
+        self.max_entries = max_entries
+        # Maps key to (expiry time, value). Expiry time is None for entries that never expire
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        """
+        Get a value from the cache, if present and not expired
+        :param key: Key of value
+        :return: Cached value, or None if there is no valid entry
+        """
+        entry = self.entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expiry, value = entry
+        if expiry is not None and expiry <= time.monotonic():
+            del self.entries[key]
+            self.misses += 1
+            return None
+
+        # Mark as most recently used
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value, ttl: Optional[float]):
+        """
+        Store a value in the cache
+        :param key: Key of value
+        :param value: Value to store
+        :param ttl: Number of seconds to keep value for. None to keep it until evicted, 0 to not store it
+        """
+        if ttl is not None and ttl <= 0:
+            return
+
+        expiry = None if ttl is None else time.monotonic() + ttl
+        self.entries[key] = (expiry, value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def replace(self, key: str, value):
+        """
+        Replace a value still in the cache, keeping when it expires. Nothing is stored if it isn't present
+        :param key: Key of value
+        :param value: New value
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries[key] = (entry[0], value)
+
+    def invalidate(self, key: str):
+        """
+        Remove a value from the cache, if present
+        :param key: Key of value
+        """
+        self.entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove all values from the cache
+        """
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get statistics about how the cache has been used
+        :return: Dictionary with hits, misses, evictions, hit ratio and size
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'size': len(self.entries)
+        }
@@ -1,8 +1,23 @@
+import asyncio
+
 import discord
 import random
+import tabulate
+
+from fpl_api import FplApi, get_player_image
+
+# Set by set_fpl_api before any embeds are built
+fplApi: FplApi = None
+
+
+def set_fpl_api(fpl_api: FplApi):
+    """
+    Set the FplApi embeds get their data from
+    :param fpl_api: FplApi to use
+    """
+    global fplApi
+    fplApi = fpl_api
 
-from fpl_api import get_player_image
-from bot import fplApi
 
 def underscore(string):
     return string.replace(' ', '_')
@@ -43,29 +58,89 @@ def predict_goals(attack: int, defence: int) -> int:
     return goals if goals > 0 else 0
 
 
+def random_colour() -> discord.Colour:
+    return discord.Colour(int('%06x' % random.randrange(16 ** 6), 16))
+
+
+class RenderCache:
+    """
+    Stores built embeds that only depend on the bootstrap data and fixtures,
+    keyed by embed type and arguments. Everything is thrown away once fplApi's data is updated
+    """
+
+    def __init__(self):
+        self.data_version = None
+        self.embed_dicts = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, embed_class, *args) -> discord.Embed:
+        """
+        Get an embed, building it only if it isn't cached for the current data
+        :param embed_class: Type of embed
+        :param args: Arguments to build embed with
+        :return: Embed
+        """
+        if self.data_version != fplApi.data_version:
+            self.embed_dicts.clear()
+            self.data_version = fplApi.data_version
+
+        key = (embed_class.__name__, *args)
+        embed_dict = self.embed_dicts.get(key)
+
+        if embed_dict is None:
+            self.misses += 1
+            embed_dict = embed_class(*args).to_dict()
+            self.embed_dicts[key] = embed_dict
+        else:
+            self.hits += 1
+
+        # Embeds are mutable, so always hand out a copy, with a new random colour like a freshly built one
+        embed = embed_class.from_dict(embed_dict)
+        embed.colour = random_colour()
+        return embed
+
+    def stats(self) -> dict:
+        """
+        Get statistics about how the cache has been used
+        :return: Dictionary with hits, misses, hit ratio and size
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'size': len(self.embed_dicts)
+        }
+
+
+render_cache = RenderCache()
+
+
 # Default embed settings
 class FplEmbed(discord.Embed):
     def __init__(self):
         super().__init__()
         self.type = 'rich'
         # Use random colour
-        self.colour = discord.Colour(int('%06x' % random.randrange(16 ** 6), 16))
+        self.colour = random_colour()
         self.set_author(name='fpl-discord-bot',
                         url='https://github.com/garamlee500/fpl-discord-bot',
                         icon_url="https://raw.githubusercontent.com/garamlee500/fpl-discord-bot/main/fpl.png?c=3")
 
+    @classmethod
+    def cached(cls, *args):
+        """
+        Get this embed from the render cache. Only for embeds that don't fetch anything from the api
+        :param args: Arguments to build embed with
+        :return: Embed
+        """
+        return render_cache.get(cls, *args)
+
 
 class PlayerProfileEmbed(FplEmbed):
-    def __init__(self, player_id: int, gameweek: int):
+    def __init__(self, player_dict: dict, player_gameweek_info: dict, player_gameweek_points: list, gameweek: int):
         super().__init__()
-        player_dict = fplApi.view_player(player_id)
-
-        player_gameweek_info = fplApi.view_player_on_gameweek(player_id, gameweek)
-        player_gameweek_points = fplApi.view_player_gameweek_points(player_id, gameweek)
-
-        while not player_gameweek_info:
-            self.__init__(player_id, gameweek-1)
-            return
 
         team = fplApi.view_team(player_dict["team"] - 1)
 
@@ -129,6 +204,20 @@ class PlayerProfileEmbed(FplEmbed):
                              f"Selected by: {str(player_gameweek_info['selected'])}",
                        inline=True)
 
+    @classmethod
+    async def create(cls, player_id: int, gameweek: int):
+        """
+        Fetch everything needed for a player's profile, then build the embed.
+        If the player didn't play on the gameweek, the closest previous gameweek is used
+        :param player_id: Id of player
+        :param gameweek: Gameweek to show performance for
+        :return: Embed
+        """
+        player_gameweek = await fplApi.view_player_gameweek_async(player_id, gameweek)
+
+        return cls(player_gameweek['player'], player_gameweek['match'], player_gameweek['points'],
+                   player_gameweek['gameweek'])
+
 
 class TeamProfileEmbed(FplEmbed):
     def __init__(self, team_name: str):
@@ -231,17 +320,15 @@ class ComparisonEmbed(FplEmbed):
 
 
 class FplTeamEmbed(FplEmbed):
-    def __init__(self, manager_id: int, gameweek: int = fplApi.gameweek):
+    def __init__(self, manager: dict, transfers: list, team: dict, history: dict,
+                 player_points: dict, live_score: dict, gameweek: int):
         super().__init__()
-        manager = fplApi.get_fpl_manager(manager_id)
 
         if 'id' not in manager:
             self.title = "Manager not found!"
             return
 
-        transfers = fplApi.get_fpl_transfers(manager_id)
-        team = fplApi.get_fpl_team(manager_id, gameweek)
-        history = fplApi.get_fpl_manager_history(manager_id)
+        manager_id = manager['id']
 
         self.title = manager["name"]
         full_name = manager["player_first_name"] + ' ' + manager['player_last_name']
@@ -289,9 +376,10 @@ class FplTeamEmbed(FplEmbed):
         team_info = ''
         sub_info = ''
         for i, player in enumerate(team["picks"]):
-            if player['multiplier'] == 0:
-                player['multiplier'] = 1
-            player_performance = fplApi.view_player_on_gameweek(player['element'], gameweek)
+            # The live score knows who has the armband after substitutions
+            multiplier = 1
+            if player['element'] == live_score['captain']:
+                multiplier = 3 if team.get('active_chip') == '3xc' else 2
             player_details = fplApi.view_player(player['element'], no_api=True)
 
             player_team = fplApi.view_team(player_details['team']-1)
@@ -301,21 +389,29 @@ class FplTeamEmbed(FplEmbed):
             except KeyError:
                 emoji = emojis[underscore(player_team['name'])+'_shirt']
 
-            try:
-                points = player_performance['total_points']
-            except KeyError:
-                points = '-'
+            # Players without a match this gameweek have no points
+            points = player_points.get(player['element'])
+            points = '-' if points is None else points * multiplier
 
             info = f"{emoji} **({player_details['position_short']})** *{player_details['full_name']}*:" \
-                           f" {str(points * player['multiplier'])} points"
-            info += ' (c)\n' if player['is_captain'] else (' (vc)\n' if player['is_vice_captain'] else '\n')
+                           f" {str(points)} points"
+            info += ' (c)' if player['is_captain'] else (' (vc)' if player['is_vice_captain'] else '')
+
+            # Mark automatic substitutions
+            counted = player['element'] in live_score['counted']
+            if i < 11 and not counted:
+                info += ' ⬇'
+            elif i >= 11 and counted and team.get('active_chip') != 'bboost':
+                info += ' ⬆'
+            info += '\n'
 
             if i>=11:
                 sub_info += info
             else:
                 team_info += info
 
-        self.add_field(name=f'Gameweek {str(gameweek)} Team', value=team_info, inline=False)
+        self.add_field(name=f'Gameweek {str(gameweek)} Team ({live_score["points"]} live points)',
+                       value=team_info, inline=False)
         self.add_field(name=f'Gameweek {str(gameweek)} Subs', value=sub_info, inline=False)
 
         transfer_list = []
@@ -339,3 +435,66 @@ class FplTeamEmbed(FplEmbed):
                                value='Transfers not shown due to being over character limit')
 
         self.url = f"https://fantasy.premierleague.com/entry/{str(manager_id)}/event/{str(gameweek)}"
+
+    @classmethod
+    async def create(cls, manager_id: int, gameweek: int = 0):
+        """
+        Fetch a manager's data for a gameweek, then build the embed
+        :param manager_id: Id of fpl manager
+        :param gameweek: Gameweek to show, defaults to current gameweek
+        :return: Embed
+        """
+        if gameweek == 0:
+            gameweek = fplApi.gameweek
+
+        manager = await fplApi.get_fpl_manager_async(manager_id)
+
+        if 'id' not in manager:
+            return cls(manager, [], {}, {}, {}, {}, gameweek)
+
+        # All players' points come from one live gameweek download
+        transfers, team, history, player_points = await asyncio.gather(
+            fplApi.get_fpl_transfers_async(manager_id),
+            fplApi.get_fpl_team_async(manager_id, gameweek),
+            fplApi.get_fpl_manager_history_async(manager_id),
+            fplApi.view_gameweek_points_async(gameweek)
+        )
+        live_score, = await fplApi.score_teams_async([team], gameweek)
+
+        return cls(manager, transfers, team, history, player_points, live_score, gameweek)
+
+
+class LeagueStandingsEmbed(FplEmbed):
+    def __init__(self, league_standings: dict, page: int, live_scores: dict = None, page_size: int = 25):
+        super().__init__()
+        league = league_standings['league']
+        standings = league_standings['standings']
+        page_count = max(1, -(-len(standings) // page_size))
+        live_scores = live_scores or {}
+
+        standings_in_list = []
+        for result in standings[page * page_size:(page + 1) * page_size]:
+            # Live points include automatic substitutions and captaincy changes not yet in the standings
+            live_score = live_scores.get(result['entry'])
+            standings_in_list.append([result['rank'], result['entry_name'][:20], result['event_total'],
+                                      '-' if live_score is None else live_score['points'], result['total']])
+
+        table = tabulate.tabulate(standings_in_list, headers=["Rank", "Team", "GW", "Live", "Total"],
+                                  tablefmt='presto')
+
+        self.title = league['name']
+        self.description = '```' + table + '```'
+        self.set_footer(text=f"Page {page + 1} of {page_count} - {len(standings)} managers")
+        self.url = f"https://fantasy.premierleague.com/leagues/{league['id']}/standings/c"
+
+
+def warm_render_cache():
+    """
+    Build every team's profile ahead of time, so they are ready as soon as the data changes
+    """
+    for team_name in fplApi.view_teamname_list():
+        try:
+            TeamProfileEmbed.cached(team_name)
+        except KeyError:
+            # Teams without emojis can't be shown
+            pass
@@ -1,42 +1,253 @@
+import asyncio
+import json
 import sqlite3
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from sqlite3 import Error
 
 class FplDatabase:
-    def __init__(self):
+    """
+    All database work runs on one dedicated thread, so it never blocks the event loop.
+    Fpl ids are also kept in memory, and writes are batched into one transaction every write_delay seconds
+    """
+
+    def __init__(self, write_delay: float = 1):
+        """
+        Initialises new FplDatabase, loading all stored fpl ids into memory
+        :param write_delay: Number of seconds to collect writes for before writing them all at once
+        """
         sql_to_create_account_table = '''CREATE TABLE IF NOT EXISTS fplIDS (
             discord_id integer PRIMARY KEY,
             fpl_id integer NOT NULL
             )
             '''
+        # Responses from the fpl api that can never change again, e.g. live data from finished gameweeks.
+        # The json is stored zlib compressed
+        sql_to_create_response_table = '''CREATE TABLE IF NOT EXISTS fplResponses (
+            endpoint_kind text NOT NULL,
+            gameweek integer NOT NULL,
+            object_id integer NOT NULL,
+            data blob NOT NULL,
+            PRIMARY KEY (endpoint_kind, gameweek, object_id)
+            )
+            '''
+        # Latest copy of data the bot needs to start, e.g. the bootstrap data, so it can start without the fpl api.
+        # The json is stored zlib compressed
+        sql_to_create_snapshot_table = '''CREATE TABLE IF NOT EXISTS fplSnapshots (
+            name text PRIMARY KEY,
+            saved_at real NOT NULL,
+            data blob NOT NULL
+            )
+            '''
+        self.write_delay = write_delay
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='database')
+
+        # Maps discord id to fpl id, for every stored account
+        self.fpl_ids = {}
+
+        # Writes waiting to be made, as dictionaries mapping primary key to row
+        self.pending_fpl_ids = {}
+        self.pending_responses = {}
+        self.pending_snapshots = {}
+        self.flush_scheduled = False
+
         try:
-            # create connection
-            self.conn = sqlite3.connect('database.db')
+            # create connection. It is only ever used by the database thread
+            self.conn = self.run(sqlite3.connect, 'database.db', check_same_thread=False)
 
-            c = self.conn.cursor()
-            c.execute(sql_to_create_account_table)
+            self.run(self.conn.execute, 'PRAGMA journal_mode=WAL')
+            self.run(self.conn.execute, 'PRAGMA synchronous=NORMAL')
+            self.run(self.conn.execute, sql_to_create_account_table)
+            self.run(self.conn.execute, sql_to_create_response_table)
+            self.run(self.conn.execute, sql_to_create_snapshot_table)
+
+            self.fpl_ids = dict(self.run(self._fetch_all, 'SELECT discord_id, fpl_id FROM fplIDS'))
 
         except Error as e:
             print(e)
 
+    def run(self, function, *args, **kwargs):
+        """
+        Run a function on the database thread, and wait for its result
+        :param function: Function to run
+        :return: Result of function
+        """
+        return self.executor.submit(function, *args, **kwargs).result()
+
+    async def run_async(self, function, *args):
+        """
+        Run a function on the database thread, without blocking the event loop
+        :param function: Function to run
+        :return: Result of function
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    def _fetch_all(self, sql, parameters=()):
+        return self.conn.execute(sql, parameters).fetchall()
+
     def set_fpl_id(self, discord_id, fpl_id):
+        """
+        Store the fpl id of a discord user. It can be found straight away, but is written later
+        :param discord_id: Id of discord user
+        :param fpl_id: Id of their fpl account
+        """
+        self.fpl_ids[discord_id] = fpl_id
+        self.pending_fpl_ids[discord_id] = (discord_id, fpl_id)
+        self.schedule_flush()
+
+    def find_fpl_id(self, discord_id):
+        """
+        Find the fpl id of a discord user, from memory
+        :param discord_id: Id of discord user
+        :return: Their fpl id, or None if they haven't set one
+        """
+        return self.fpl_ids.get(discord_id)
+
+    def store_response(self, endpoint_kind, gameweek, object_id, data):
+        """
+        Permanently store a response that will never change. It is written later
+        :param endpoint_kind: Type of endpoint, e.g. 'live' or 'picks'
+        :param gameweek: Gameweek the response is for
+        :param object_id: Id of the object the response is about (e.g. manager id), 0 if there is none
+        :param data: Unpacked response
+        """
+        key = (endpoint_kind, gameweek, object_id)
+        self.pending_responses[key] = (endpoint_kind, gameweek, object_id, data)
+        self.schedule_flush()
+
+    def find_response(self, endpoint_kind, gameweek, object_id):
+        """
+        Find a stored response
+        :param endpoint_kind: Type of endpoint, e.g. 'live' or 'picks'
+        :param gameweek: Gameweek the response is for
+        :param object_id: Id of the object the response is about (e.g. manager id), 0 if there is none
+        :return: Unpacked response, or None if it isn't stored
+        """
+        pending_response = self.pending_responses.get((endpoint_kind, gameweek, object_id))
+        if pending_response is not None:
+            return pending_response[3]
+        return self.run(self._read_response, endpoint_kind, gameweek, object_id)
+
+    async def find_response_async(self, endpoint_kind, gameweek, object_id):
+        """
+        Awaitable version of find_response
+        :param endpoint_kind: Type of endpoint, e.g. 'live' or 'picks'
+        :param gameweek: Gameweek the response is for
+        :param object_id: Id of the object the response is about (e.g. manager id), 0 if there is none
+        :return: Unpacked response, or None if it isn't stored
+        """
+        pending_response = self.pending_responses.get((endpoint_kind, gameweek, object_id))
+        if pending_response is not None:
+            return pending_response[3]
+        return await self.run_async(self._read_response, endpoint_kind, gameweek, object_id)
+
+    def _read_response(self, endpoint_kind, gameweek, object_id):
+        sql_to_find_response = '''SELECT data FROM fplResponses
+                                   WHERE endpoint_kind = ? AND gameweek = ? AND object_id = ?'''
+
+        rows = self._fetch_all(sql_to_find_response, (endpoint_kind, gameweek, object_id))
 
-        cur = self.conn.cursor()
+        if not rows:
+            return None
+        return json.loads(zlib.decompress(rows[0][0]))
 
+    def store_snapshot(self, name, data):
+        """
+        Replace the stored snapshot of some data. It is written later
+        :param name: Name of snapshot, e.g. 'bootstrap'
+        :param data: Unpacked data
+        """
+        self.pending_snapshots[name] = (name, time.time(), data)
+        self.schedule_flush()
+
+    def find_snapshot(self, name):
+        """
+        Find the latest stored snapshot of some data
+        :param name: Name of snapshot, e.g. 'bootstrap'
+        :return: Tuple of the unix time it was saved at and the unpacked data, or None if there isn't one
+        """
+        pending_snapshot = self.pending_snapshots.get(name)
+        if pending_snapshot is not None:
+            return pending_snapshot[1], pending_snapshot[2]
+        return self.run(self._read_snapshot, name)
+
+    def _read_snapshot(self, name):
+        rows = self._fetch_all('SELECT saved_at, data FROM fplSnapshots WHERE name = ?', (name,))
+
+        if not rows:
+            return None
+        return rows[0][0], json.loads(zlib.decompress(rows[0][1]))
+
+    def schedule_flush(self):
+        """
+        Make sure pending writes will be written. Inside the event loop they are written together after
+        write_delay seconds, otherwise they are written straight away
+        """
+        if self.flush_scheduled:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+
+        self.flush_scheduled = True
+        loop.call_later(self.write_delay, self.start_flush)
+
+    def start_flush(self):
+        """
+        Hand all pending writes to the database thread, without waiting for them to be written.
+        Anything run on the database thread afterwards will see them
+        :return: Future of write
+        """
+        self.flush_scheduled = False
+        fpl_ids = list(self.pending_fpl_ids.values())
+        responses = list(self.pending_responses.values())
+        snapshots = list(self.pending_snapshots.values())
+        self.pending_fpl_ids = {}
+        self.pending_responses = {}
+        self.pending_snapshots = {}
+
+        return self.executor.submit(self._write_pending, fpl_ids, responses, snapshots)
+
+    def flush(self):
+        """
+        Write all pending writes, and wait for them to be written
+        """
+        self.start_flush().result()
+
+    def _write_pending(self, fpl_ids, responses, snapshots):
         # This SQL will delete a record and replace it if it is present
         sql_to_set_fpl_id = '''REPLACE INTO fplIDS(discord_id, fpl_id)
                                            VALUES(?,?)
                 '''
-        cur.execute(sql_to_set_fpl_id, (discord_id, fpl_id))
-        self.conn.commit()
-
-    def find_fpl_id(self, discord_id):
-        sql_to_find_fpl_id = 'SELECT * FROM fplIDS WHERE discord_id = ?'
-
-        cur = self.conn.cursor()
+        sql_to_store_response = '''REPLACE INTO fplResponses(endpoint_kind, gameweek, object_id, data)
+                                       VALUES(?,?,?,?)
+                '''
+        sql_to_store_snapshot = '''REPLACE INTO fplSnapshots(name, saved_at, data)
+                                       VALUES(?,?,?)
+                '''
+        compressed_responses = [(endpoint_kind, gameweek, object_id,
+                                 zlib.compress(json.dumps(data, separators=(',', ':')).encode()))
+                                for endpoint_kind, gameweek, object_id, data in responses]
+        compressed_snapshots = [(name, saved_at, zlib.compress(json.dumps(data, separators=(',', ':')).encode()))
+                                for name, saved_at, data in snapshots]
 
-        cur.execute(sql_to_find_fpl_id, (discord_id,))
         try:
-            fpl_id = cur.fetchall()[0][1]
-        except:
-            fpl_id = None
-        return fpl_id
\ No newline at end of file
+            # One transaction for everything
+            with self.conn:
+                self.conn.executemany(sql_to_set_fpl_id, fpl_ids)
+                self.conn.executemany(sql_to_store_response, compressed_responses)
+                self.conn.executemany(sql_to_store_snapshot, compressed_snapshots)
+        except Error as e:
+            print(e)
+
+    def close(self):
+        """
+        Write anything pending, then close the database
+        """
+        self.flush()
+        self.run(self.conn.close)
+        self.executor.shutdown()
@@ -0,0 +1,138 @@
+import numpy as np
+
+# Highest difficulty a fixture can have, as in the fpl fixture difficulty ratings
+MAX_DIFFICULTY = 5
+
+
+class FixtureDifficultyMatrix:
+    """
+    Difficulty of every team's fixtures in every gameweek, as team × gameweek arrays.
+    Each fixture's difficulty is the average of its fpl difficulty rating and the opponent's strength,
+    scaled to the same 1 to 5 range. Gameweeks are scored by ease, the sum of (6 - difficulty) over their fixtures,
+    so a blank gameweek is worth nothing and a double gameweek is worth both its fixtures
+    """
+
+    def __init__(self, team_list: list, fixtures: list, gameweek_count: int = 38):
+        """
+        Build matrix from fixtures
+        :param team_list: List of teams from the bootstrap data
+        :param fixtures: List of fixtures
+        :param gameweek_count: Number of gameweeks in the season
+        """
+        self.team_list = team_list
+        self.gameweek_count = gameweek_count
+        # Row of each team in the arrays
+        self.team_rows = {team["id"]: row for row, team in enumerate(team_list)}
+
+        # Gameweek columns start at 1, column 0 is left empty
+        shape = (len(team_list), gameweek_count + 1)
+        self.fixture_counts = np.zeros(shape, dtype=np.int64)
+        self.difficulty_sums = np.zeros(shape, dtype=np.float64)
+        self.ease = np.zeros(shape, dtype=np.float64)
+        # Opponents of each team in each gameweek, upper case at home and lower case away
+        self.labels = [[[] for _ in range(gameweek_count + 1)] for _ in team_list]
+
+        opponent_strengths = self.opponent_strengths()
+
+        for fixture in fixtures:
+            gameweek = fixture["event"]
+            # Unscheduled fixtures have no gameweek yet
+            if gameweek is None or not 1 <= gameweek <= gameweek_count:
+                continue
+            home_row = self.team_rows.get(fixture["team_h"])
+            away_row = self.team_rows.get(fixture["team_a"])
+            if home_row is None or away_row is None:
+                continue
+
+            for row, opponent_row, rating, is_home in ((home_row, away_row, fixture["team_h_difficulty"], True),
+                                                       (away_row, home_row, fixture["team_a_difficulty"], False)):
+                # Opponents playing at home are playing away from this team's point of view, and vice versa
+                difficulty = (rating + opponent_strengths[opponent_row, int(is_home)]) / 2
+
+                self.fixture_counts[row, gameweek] += 1
+                self.difficulty_sums[row, gameweek] += difficulty
+                self.ease[row, gameweek] += MAX_DIFFICULTY + 1 - difficulty
+
+                opponent_name = team_list[opponent_row]["short_name"]
+                self.labels[row][gameweek].append(opponent_name.upper() if is_home else opponent_name.lower())
+
+        # Ease of every run of gameweeks is the difference of two of these
+        self.cumulative_ease = np.cumsum(self.ease, axis=1)
+        self.cumulative_fixture_counts = np.cumsum(self.fixture_counts, axis=1)
+
+    def opponent_strengths(self) -> np.ndarray:
+        """
+        Scale every team's overall strength at home and away to the range of difficulty ratings
+        :return: Array with one row per team, of strength at home then away, from 1 to 5
+        """
+        if not self.team_list:
+            return np.zeros((0, 2))
+
+        strengths = np.array([[team["strength_overall_home"], team["strength_overall_away"]]
+                              for team in self.team_list], dtype=np.float64)
+        weakest, strongest = strengths.min(), strengths.max()
+        if strongest == weakest:
+            return np.full(strengths.shape, (MAX_DIFFICULTY + 1) / 2)
+        return 1 + (strengths - weakest) / (strongest - weakest) * (MAX_DIFFICULTY - 1)
+
+    def clamp_run(self, start_gameweek: int, length: int) -> tuple:
+        """
+        Keep a run of gameweeks inside the season
+        :param start_gameweek: First gameweek of run
+        :param length: Number of gameweeks in run
+        :return: Tuple of first and last gameweek of run
+        """
+        start_gameweek = min(max(start_gameweek, 1), self.gameweek_count)
+        end_gameweek = min(start_gameweek + max(length, 1) - 1, self.gameweek_count)
+        return start_gameweek, end_gameweek
+
+    def run_ease(self, start_gameweek: int, length: int) -> np.ndarray:
+        """
+        Find the ease of every team's fixtures over a run of gameweeks
+        :param start_gameweek: First gameweek of run
+        :param length: Number of gameweeks in run
+        :return: Array of ease, one per team, in the same order as the team list
+        """
+        start_gameweek, end_gameweek = self.clamp_run(start_gameweek, length)
+        return self.cumulative_ease[:, end_gameweek] - self.cumulative_ease[:, start_gameweek - 1]
+
+    def easiest_runs(self, start_gameweek: int, length: int) -> list:
+        """
+        Rank every team by how easy their fixtures are over a run of gameweeks
+        :param start_gameweek: First gameweek of run
+        :param length: Number of gameweeks in run
+        :return: List of dictionaries with team, ease, number of fixtures, average difficulty,
+        and opponents in each gameweek, easiest first
+        """
+        start_gameweek, end_gameweek = self.clamp_run(start_gameweek, length)
+
+        run_ease = self.run_ease(start_gameweek, length)
+        run_fixture_counts = (self.cumulative_fixture_counts[:, end_gameweek] -
+                              self.cumulative_fixture_counts[:, start_gameweek - 1])
+        run_difficulty_sums = self.difficulty_sums[:, start_gameweek:end_gameweek + 1].sum(axis=1)
+
+        # Stable, so teams with equal ease keep their order from the team list
+        order = np.argsort(-run_ease, kind='stable')
+
+        return [{
+            'team': self.team_list[row],
+            'ease': float(run_ease[row]),
+            'fixture_count': int(run_fixture_counts[row]),
+            'average_difficulty': float(run_difficulty_sums[row] / run_fixture_counts[row])
+            if run_fixture_counts[row] else 0.0,
+            'opponents': self.labels[row][start_gameweek:end_gameweek + 1]
+        } for row in order]
+
+    def blank_and_double_gameweeks(self) -> dict:
+        """
+        Find which teams have blank and double gameweeks
+        :return: Dictionary mapping gameweek to dictionary with the ids of teams that blank and of those with doubles
+        """
+        gameweeks = {}
+        for gameweek in range(1, self.gameweek_count + 1):
+            counts = self.fixture_counts[:, gameweek]
+            blanks = [self.team_list[row]["id"] for row in np.flatnonzero(counts == 0)]
+            doubles = [self.team_list[row]["id"] for row in np.flatnonzero(counts > 1)]
+            if blanks or doubles:
+                gameweeks[gameweek] = {'blank': blanks, 'double': doubles}
+        return gameweeks
@@ -1,12 +1,45 @@
 from datetime import datetime
 
-import requests
+import aiohttp
 import json
 import asyncio
-from typing import Union
+import re
+import time
+from typing import Optional, Union
+
+from cache import ResponseCache
+from fixture_planner import FixtureDifficultyMatrix
+from live_scoring import LiveScorer
+from metrics import Metrics, endpoint_label
+from player_search import PlayerSearchIndex
+from player_table import PlayerTable
+from transfer_suggestions import projected_points, suggest_transfers
+from transport import HttpTransport
 
 GAMEWEEK_COUNT = 38
 
+# Number of seconds responses from each endpoint are cached for.
+# Endpoints not listed here are never cached
+ENDPOINT_CACHE_TTLS = [
+    (re.compile(r"^/element-summary/\d+/$"), 60),
+    (re.compile(r"^/event/\d+/live/$"), 60),
+    (re.compile(r"^/entry/\d+/event/\d+/picks/$"), 60),
+    (re.compile(r"^/entry/\d+/history/$"), 60),
+    (re.compile(r"^/entry/\d+/transfers/$"), 60),
+    (re.compile(r"^/entry/\d+/$"), 60),
+    (re.compile(r"^/leagues-classic/\d+/standings/"), 60),
+]
+
+# Parts of the bootstrap data every update needs
+BOOTSTRAP_KEYS = ("events", "teams", "elements", "element_types")
+
+# Endpoints whose responses can never change again once their gameweek has finished,
+# stored permanently under their kind, gameweek and id (0 if there isn't one)
+FINISHED_GAMEWEEK_ENDPOINTS = {
+    'live': re.compile(r"^/event/(?P<gameweek>\d+)/live/$"),
+    'picks': re.compile(r"^/entry/(?P<id>\d+)/event/(?P<gameweek>\d+)/picks/$"),
+}
+
 
 def get_player_image(image_link: str) -> str:
     """
@@ -17,6 +50,29 @@ def get_player_image(image_link: str) -> str:
     return "https://resources.premierleague.com/premierleague/photos/players/110x140/p" + image_link[:-4] + ".png"
 
 
+def find_current_gameweek(events: list) -> int:
+    """
+    Goes through the gameweek list to try and find current gameweek
+    :param events: List of gameweeks, from the bootstrap data
+    :return: Current gameweek
+    """
+    # Go through all gameweeks
+    for i in range(GAMEWEEK_COUNT):
+        # Keep going through gameweeks until the current one is found
+        if events[i]["is_current"]:
+            return i + 1
+
+    # Not sure how if there's no current gameweek? (I'm not sure how the api works yet so i'll leave this here)
+    # If there's no current use the previous one
+    for i in range(GAMEWEEK_COUNT):
+        # Keep going through gameweeks until the previous one is found
+        if events[i]["is_previous"]:
+            return i + 1
+
+    # If all gameweeks finished, return gameweek 38
+    return GAMEWEEK_COUNT
+
+
 def extract_dictionary(dictionary: dict, keys_to_extract: list) -> dict:
     """
     Uses dictionary comprehension to keep only certain keys from the dictionary
@@ -27,6 +83,27 @@ def extract_dictionary(dictionary: dict, keys_to_extract: list) -> dict:
     return {key: dictionary[key] for key in keys_to_extract}
 
 
+class FplApiUnavailable(Exception):
+    """
+    Raised when the fpl api doesn't give the data asked for, e.g. while the game is being updated
+    """
+    pass
+
+
+def check_response(endpoint: str, unpacked_data, expected_type: type, expected_keys: tuple = ()):
+    """
+    Check a response is the data asked for, and not an error. While the game is being updated,
+    the fpl api responds with just a string, or an html page
+    :param endpoint: Endpoint of response
+    :param unpacked_data: Unpacked response
+    :param expected_type: Type the data should be
+    :param expected_keys: Keys the data should have
+    :raises FplApiUnavailable: If the response isn't the data asked for
+    """
+    if not isinstance(unpacked_data, expected_type) or any(key not in unpacked_data for key in expected_keys):
+        raise FplApiUnavailable(f"Unexpected response from {endpoint}: {str(unpacked_data)[:100]}")
+
+
 class FplApi:
     """
     FplApi aims to creates a simple way to interact with fpl's api endpoints
@@ -35,20 +112,91 @@ class FplApi:
         as with all authentication requiring endpoints.
     """
 
-    def __init__(self):
+    def __init__(self, max_connections: int = 10, request_timeout: int = 30, cache_size: int = 1024,
+                 database=None, league_cache_size: int = 100, league_page_concurrency: int = 8, metrics=None,
+                 transport=None, snapshot_interval: float = 600, league_page_attempts: int = 3):
         """
         Initialises new FplApi.
-        All updates done here too
+        Data is loaded from the last snapshot in the database if there is one, so the fpl api isn't needed to start.
+        Otherwise it is downloaded here
+        :param max_connections: Maximum number of simultaneous connections to the fpl api, used by async methods
+        :param request_timeout: Number of seconds before an async request is abandoned
+        :param cache_size: Maximum number of responses to keep cached
+        :param database: FplDatabase to permanently store finished gameweek data in, if any
+        :param league_cache_size: Maximum number of leagues' full standings to keep
+        :param league_page_concurrency: Maximum number of pages of one league's standings to download at once
+        :param metrics: Metrics to record request and update latencies in. A new one is made if not given
+        :param transport: Transport requests are sent with, e.g. a ReplayTransport to run without the fpl api.
+        An HttpTransport using max_connections and request_timeout if not given
+        :param snapshot_interval: Minimum number of seconds between saving snapshots of the data to the database
+        :param league_page_attempts: Maximum number of times to try downloading each page of a league's standings
         """
+        self.database = database
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.max_connections = max_connections
+        self.request_timeout = request_timeout
+        self.cache = ResponseCache(max_entries=cache_size)
+        # Copies of responses kept warm in the background, served once expired from the cache while they
+        # are downloaded again, so callers don't wait on the fpl api
+        self.stale_cache = ResponseCache(max_entries=cache_size)
+        self.stale_response_count = 0
+
+        # Maps endpoint to the future of the async request fetching it, while it is being fetched
+        self.in_flight_requests = {}
+        self.coalesced_request_count = 0
+
+        if transport is None:
+            transport = HttpTransport(max_connections=max_connections, request_timeout=request_timeout)
+        self.transport = transport
+
         self.main_data = {}
         self.fixtures = {}
         self.current_gameweek_data = {}
         self.playername_id_dict = {}
+        self.player_search_index = PlayerSearchIndex([])
         self.team_list = []
         self.player_list = []
         self.gameweek = 0
 
-        self.update_all()
+        # Lookup indexes, rebuilt whenever the data they index is updated
+        self.player_by_id = {}
+        self.player_table = PlayerTable([])
+        self.players_by_team = {}
+        self.team_by_id = {}
+        self.team_by_name = {}
+        self.team_by_code = {}
+        self.fixture_by_id = {}
+        self.fixtures_by_team = {}
+        self.fixtures_by_gameweek = {}
+        self.fixture_difficulty = FixtureDifficultyMatrix([], [])
+
+        # Fpl scores of every team, by team id, recalculated whenever players or fixtures are updated
+        self.team_scores = {}
+
+        # Increased every time the data is updated, so anything calculated from it can tell if it is out of date
+        self.data_version = 0
+        # Functions called, with no arguments, after every update
+        self.update_callbacks = []
+        self.last_update_duration = 0.0
+        self.failed_update_count = 0
+
+        self.snapshot_interval = snapshot_interval
+        self.last_snapshot_time = None
+        # True until data is downloaded, if it was loaded from a snapshot
+        self.loaded_from_snapshot = False
+
+        # Maps gameweek to (live gameweek data, that data indexed by player id)
+        self.gameweek_data_indexes = {}
+        # Maps gameweek to (live gameweek data, LiveScorer made from it)
+        self.live_scorers = {}
+
+        # Full standings of classic leagues, by league id
+        self.league_standings_cache = ResponseCache(max_entries=league_cache_size)
+        self.league_page_concurrency = league_page_concurrency
+        self.league_page_attempts = league_page_attempts
+
+        if not self.load_snapshot():
+            self.update_all()
 
     def access_fpl_api(self, endpoint: str) -> dict:
         """
@@ -59,9 +207,252 @@ class FplApi:
         :param endpoint: endpoint to be attached to api link
         :return: Returns response, unpacked as a dictionary
         """
+        cached_data = self.find_stored_response(endpoint)
+        if cached_data is not None:
+            return cached_data
+
+        start_time = time.perf_counter()
+        status, content = self.download(endpoint)
+        unpacked_data = json.loads(content)
+        self.record_request_latency(endpoint, time.perf_counter() - start_time)
+
+        if status == 200:
+            self.store_response(endpoint, unpacked_data)
+        return unpacked_data
+
+    def download(self, endpoint: str) -> tuple:
+        """
+        Send a request to the fpl api with the transport, blocking until the response arrives
+        :param endpoint: endpoint to be attached to api link
+        :return: Tuple of status code and body of response
+        """
+        return self.transport.get(endpoint)
+
+    async def download_async(self, endpoint: str) -> tuple:
+        """
+        Awaitable version of download
+        :param endpoint: endpoint to be attached to api link
+        :return: Tuple of status code and body of response
+        """
+        return await self.transport.get_async(endpoint)
+
+    def find_stored_response(self, endpoint: str):
+        """
+        Look for a response in the cache, and then in the database if it can never change
+        :param endpoint: Endpoint of response
+        :return: Unpacked response, or None if it isn't stored
+        """
+        cached_data = self.cache.get(endpoint)
+        if cached_data is not None:
+            return cached_data
+
+        stored_key = self.finished_gameweek_key(endpoint)
+        if stored_key is None or self.database is None:
+            return None
+
+        stored_data = self.database.find_response(*stored_key)
+        if stored_data is not None:
+            self.cache.set(endpoint, stored_data, None)
+        return stored_data
+
+    async def find_database_response_async(self, endpoint: str):
+        """
+        Look for a response in the database, if it can never change, without blocking while reading it
+        :param endpoint: Endpoint of response
+        :return: Unpacked response, or None if it isn't stored
+        """
+        stored_key = self.finished_gameweek_key(endpoint)
+        if stored_key is None or self.database is None:
+            return None
+
+        stored_data = await self.database.find_response_async(*stored_key)
+        if stored_data is not None:
+            self.cache.set(endpoint, stored_data, None)
+        return stored_data
+
+    def store_response(self, endpoint: str, unpacked_data, stale_ttl: float = 0):
+        """
+        Cache a successful response, and store it in the database too if it can never change
+        :param endpoint: Endpoint of response
+        :param unpacked_data: Unpacked response
+        :param stale_ttl: Number of seconds to keep serving the response for once expired, while it is
+        downloaded again. 0 to only update a stale copy already kept
+        """
+        self.cache.set(endpoint, unpacked_data, self.endpoint_cache_ttl(endpoint))
+        if stale_ttl:
+            self.stale_cache.set(endpoint, unpacked_data, stale_ttl)
+        else:
+            self.stale_cache.replace(endpoint, unpacked_data)
+
+        stored_key = self.finished_gameweek_key(endpoint)
+        if stored_key is not None and self.database is not None:
+            self.database.store_response(*stored_key, unpacked_data)
+
+    def record_request_latency(self, endpoint: str, seconds: float):
+        """
+        Record how long a request to the fpl api took
+        :param endpoint: Endpoint of request
+        :param seconds: Number of seconds from sending the request to unpacking the response
+        """
+        self.metrics.observe('fpl_api_request_seconds', 'endpoint', endpoint_label(endpoint), seconds,
+                             'Time taken by requests to the fpl api, by endpoint')
+
+    def record_update_latency(self, seconds: float):
+        """
+        Record how long an update of all data took
+        :param seconds: Number of seconds from starting the downloads to finishing the indexes
+        """
+        self.last_update_duration = seconds
+        self.metrics.observe('fpl_update_seconds', 'update', 'all', seconds,
+                             'Time taken to download bootstrap data and fixtures, and rebuild indexes')
+
+    def stats(self) -> dict:
+        """
+        Get counts of requests and updates
+        :return: Dictionary of request and update counts
+        """
+        return {
+            'in_flight_requests': len(self.in_flight_requests),
+            'coalesced_requests': self.coalesced_request_count,
+            'stale_responses': self.stale_response_count,
+            'data_version': self.data_version,
+            'gameweek': self.gameweek,
+            'last_update_duration': self.last_update_duration,
+            'failed_updates': self.failed_update_count
+        }
+
+    def finished_gameweek_key(self, endpoint: str) -> Optional[tuple]:
+        """
+        Find the key a response is permanently stored under, if it is from a finished gameweek
+        :param endpoint: Endpoint of response
+        :return: Tuple of endpoint kind, gameweek and id, or None if the response may still change
+        """
+        for endpoint_kind, pattern in FINISHED_GAMEWEEK_ENDPOINTS.items():
+            match = pattern.match(endpoint)
+            if match and self.is_gameweek_finished(int(match.group('gameweek'))):
+                return endpoint_kind, int(match.group('gameweek')), int(match.groupdict().get('id') or 0)
+
+        return None
+
+    def endpoint_cache_ttl(self, endpoint: str) -> Optional[float]:
+        """
+        Find how long a response from an endpoint can be cached for
+        :param endpoint: Endpoint of response
+        :return: Number of seconds to cache for, or None if the response can never change
+        """
+        if self.finished_gameweek_key(endpoint) is not None:
+            return None
+
+        for pattern, ttl in ENDPOINT_CACHE_TTLS:
+            if pattern.match(endpoint):
+                return ttl
+
+        return 0
+
+    def is_gameweek_finished(self, gameweek: int) -> bool:
+        """
+        Check if all matches in a gameweek have finished, and its points are final
+        :param gameweek: Gameweek to check
+        :return: True if gameweek is finished
+        """
+        if not self.main_data or not 1 <= gameweek <= len(self.main_data["events"]):
+            return False
+        return self.main_data["events"][gameweek - 1]["finished"]
+
+    async def close(self):
+        """
+        Close all connections to the fpl api
+        """
+        await self.transport.close()
+
+    async def access_fpl_api_async(self, endpoint: str) -> dict:
+        """
+        Same as access_fpl_api, but does not block the event loop while waiting for the response
+        Identical requests made while one is already being fetched wait for its result instead of
+        fetching it again. Expired responses kept warm by refresh_fpl_api_async are returned straight away,
+        and downloaded again in the background
+        :param endpoint: endpoint to be attached to api link
+        :return: Returns response, unpacked as a dictionary
+        """
+        cached_data = self.cache.get(endpoint)
+        if cached_data is not None:
+            return cached_data
+
+        stale_data = self.stale_cache.get(endpoint)
+        if stale_data is not None:
+            self.stale_response_count += 1
+            if endpoint not in self.in_flight_requests:
+                self._start_request(endpoint)
+            return stale_data
+
+        request = self.in_flight_requests.get(endpoint)
+        if request is None:
+            request = self._start_request(endpoint)
+        else:
+            self.coalesced_request_count += 1
+
+        # Shielded, so one caller being cancelled doesn't cancel the request for everyone else waiting on it
+        return await asyncio.shield(request)
+
+    async def refresh_fpl_api_async(self, endpoint: str, stale_ttl: float = 0) -> dict:
+        """
+        Download a response again, even if it is cached, and cache it for the endpoint's usual time.
+        Responses that can never change are only downloaded if they aren't already stored
+        :param endpoint: endpoint to be attached to api link
+        :param stale_ttl: Number of seconds to keep serving the response for once expired from the cache,
+        while it is downloaded again. Should last until the next refresh
+        :return: Returns response, unpacked as a dictionary
+        """
+        if self.finished_gameweek_key(endpoint) is not None:
+            return await self.access_fpl_api_async(endpoint)
+
+        # A request already being fetched is fresh enough
+        request = self.in_flight_requests.get(endpoint)
+        if request is None:
+            request = self._start_request(endpoint, stale_ttl)
+        return await asyncio.shield(request)
+
+    def _start_request(self, endpoint: str, stale_ttl: float = 0) -> asyncio.Future:
+        """
+        Start fetching a response, so other requests for it can wait on the same future
+        :param endpoint: endpoint to be attached to api link
+        :param stale_ttl: Number of seconds to keep serving the response for once expired, as in store_response
+        :return: Future of request
+        """
+        request = asyncio.ensure_future(self._fetch_fpl_api_async(endpoint, stale_ttl))
+        self.in_flight_requests[endpoint] = request
+        request.add_done_callback(lambda finished_request: self._request_done(endpoint, finished_request))
+        return request
+
+    def _request_done(self, endpoint: str, request: asyncio.Future):
+        """
+        Called when a request started by access_fpl_api_async finishes
+        :param endpoint: Endpoint of request
+        :param request: Future of request
+        """
+        self.in_flight_requests.pop(endpoint, None)
+        # Mark any error as seen, in case every caller was cancelled
+        if not request.cancelled():
+            request.exception()
+
+    async def _fetch_fpl_api_async(self, endpoint: str, stale_ttl: float = 0) -> dict:
+        """
+        Get a response from the database or the fpl api, for access_fpl_api_async
+        :param endpoint: endpoint to be attached to api link
+        :param stale_ttl: Number of seconds to keep serving the response for once expired, as in store_response
+        :return: Returns response, unpacked as a dictionary
+        """
+        stored_data = await self.find_database_response_async(endpoint)
+        if stored_data is not None:
+            return stored_data
 
-        api_data = requests.get("https://fantasy.premierleague.com/api" + endpoint)
-        unpacked_data = json.loads(api_data.content)
+        start_time = time.perf_counter()
+        status, content = await self.download_async(endpoint)
+        unpacked_data = json.loads(content)
+        self.record_request_latency(endpoint, time.perf_counter() - start_time)
+
+        if status == 200:
+            self.store_response(endpoint, unpacked_data, stale_ttl)
         return unpacked_data
 
     def get_fpl_league(self, league_id: int) -> dict:
@@ -167,14 +558,171 @@ class FplApi:
         player_data = self.access_fpl_api(f"/element-summary/{str(player_id)}/")
         return player_data
 
+    # Async versions of the getters above. These share one connection pool,
+    # so many of them can be awaited at once without blocking the event loop
+
+    async def get_fpl_league_async(self, league_id: int, page: int = 1) -> dict:
+        """
+        Awaitable version of get_fpl_league
+        :param league_id: Id of fpl league to get
+        :param page: Page of standings to get, each holding 50 managers
+        :return: Fpl league, in form of dictionary
+        """
+        if page == 1:
+            return await self.access_fpl_api_async(f"/leagues-classic/{league_id}/standings/")
+        return await self.access_fpl_api_async(f"/leagues-classic/{league_id}/standings/?page_standings={page}")
+
+    async def get_fpl_manager_async(self, manager_id: int) -> dict:
+        """
+        Awaitable version of get_fpl_manager
+        :param manager_id: Id of fpl manager
+        :return: Dictionary containing fpl data
+        """
+        return await self.access_fpl_api_async(f"/entry/{str(manager_id)}/")
+
+    async def get_fpl_manager_history_async(self, manager_id: int) -> dict:
+        """
+        Awaitable version of get_fpl_manager_history
+        :param manager_id: Id of fpl manager
+        :return: Dictionary containing gameweek history
+        """
+        return await self.access_fpl_api_async(f"/entry/{manager_id}/history/")
+
+    async def get_fpl_team_async(self, manager_id: int, gameweek: int = 0) -> dict:
+        """
+        Awaitable version of get_fpl_team
+        :param manager_id: Id of fpl manager to view team of
+        :param gameweek: Gameweek to look at team for
+        :return:  Fpl team, in form of dictionary
+        """
+        if gameweek == 0:
+            gameweek = self.gameweek
+
+        return await self.access_fpl_api_async(f"/entry/{manager_id}/event/{gameweek}/picks/")
+
+    async def get_fpl_transfers_async(self, manager_id: int) -> dict:
+        """
+        Awaitable version of get_fpl_transfers
+        :param manager_id: Id of fpl manager
+        :return: List of transfers
+        """
+        return await self.access_fpl_api_async(f"/entry/{str(manager_id)}/transfers/")
+
+    async def get_gameweek_player_data_async(self, gameweek: int) -> dict:
+        """
+        Awaitable version of get_gameweek_player_data
+        :param gameweek: Gameweek to fetch
+        :return: Gameweek data
+        """
+        return await self.access_fpl_api_async(f"/event/{str(gameweek)}/live/")
+
+    async def get_player_history_async(self, player_id: int) -> dict:
+        """
+        Awaitable version of get_player_history
+        :param player_id: The id of the player
+        :return: Statistics dictionary for that player
+        """
+        return await self.access_fpl_api_async(f"/element-summary/{str(player_id)}/")
+
     def update_all(self):
-        self.update_main_data()
-        self.update_current_gameweek()
-        self.update_fixtures()
-        self.update_current_gameweek_data()
-        self.update_team_list()
-        self.update_player_list()
-        self.update_playername_id_dict()
+        """
+        Download all data, then replace the old data and indexes with it at once
+        :raises FplApiUnavailable: If the fpl api didn't give all the data, so nothing was replaced
+        """
+        start_time = time.perf_counter()
+        main_data = self.access_fpl_api("/bootstrap-static/")
+        fixtures = self.access_fpl_api("/fixtures/")
+        check_response("/bootstrap-static/", main_data, dict, BOOTSTRAP_KEYS)
+        check_response("/fixtures/", fixtures, list)
+
+        current_gameweek = find_current_gameweek(main_data["events"])
+        current_gameweek_data = self.get_gameweek_player_data(current_gameweek)
+        check_response(f"/event/{current_gameweek}/live/", current_gameweek_data, dict, ("elements",))
+
+        self.apply_update(main_data, fixtures, current_gameweek_data)
+        self.record_update_latency(time.perf_counter() - start_time)
+        self.loaded_from_snapshot = False
+        self.save_snapshot()
+
+    async def update_all_async(self):
+        """
+        Awaitable version of update_all. Bootstrap data and fixtures are downloaded at the same time
+        :raises FplApiUnavailable: If the fpl api didn't give all the data, so nothing was replaced
+        """
+        start_time = time.perf_counter()
+        main_data, fixtures = await asyncio.gather(self.access_fpl_api_async("/bootstrap-static/"),
+                                                   self.access_fpl_api_async("/fixtures/"))
+        check_response("/bootstrap-static/", main_data, dict, BOOTSTRAP_KEYS)
+        check_response("/fixtures/", fixtures, list)
+
+        current_gameweek = find_current_gameweek(main_data["events"])
+        current_gameweek_data = await self.get_gameweek_player_data_async(current_gameweek)
+        check_response(f"/event/{current_gameweek}/live/", current_gameweek_data, dict, ("elements",))
+
+        self.apply_update(main_data, fixtures, current_gameweek_data)
+        self.record_update_latency(time.perf_counter() - start_time)
+        self.loaded_from_snapshot = False
+        self.save_snapshot()
+
+    def apply_update(self, main_data: dict, fixtures: list, current_gameweek_data: dict):
+        """
+        Replace all data, and rebuild every index from it. Indexes are only rebuilt, and data_version
+        only increased, if the bootstrap data or fixtures have changed, which between most updates they haven't.
+        Nothing here awaits, so no coroutine can see the data half updated
+        :param main_data: Data from /bootstrap-static/
+        :param fixtures: Data from /fixtures/
+        :param current_gameweek_data: Data from /event/{current gameweek}/live/
+        """
+        self.current_gameweek_data = current_gameweek_data
+
+        if main_data != self.main_data or fixtures != self.fixtures:
+            self.main_data = main_data
+            self.fixtures = fixtures
+            self.update_current_gameweek()
+            self.update_team_list()
+            self.update_player_list()
+            self.update_fixture_indexes()
+            self.update_fixture_difficulty()
+            self.update_playername_id_dict()
+            self.update_team_scores()
+            self.data_version += 1
+
+        for callback in self.update_callbacks:
+            callback()
+
+    def load_snapshot(self) -> bool:
+        """
+        Load data from the last snapshot saved in the database
+        :return: True if there was a snapshot to load
+        """
+        if self.database is None:
+            return False
+
+        snapshots = [self.database.find_snapshot(name) for name in ('bootstrap', 'fixtures', 'current_gameweek')]
+        if None in snapshots:
+            return False
+
+        (saved_at, main_data), (_, fixtures), (_, current_gameweek_data) = snapshots
+        self.apply_update(main_data, fixtures, current_gameweek_data)
+        self.loaded_from_snapshot = True
+
+        time_info = datetime.fromtimestamp(saved_at).strftime("%d/%m/%Y %H:%M:%S")
+        print(f"Loaded data from snapshot saved at {time_info}")
+        return True
+
+    def save_snapshot(self):
+        """
+        Save the current data to the database, to start from next time, at most once every snapshot_interval seconds
+        """
+        if self.database is None:
+            return
+        if self.last_snapshot_time is not None and time.monotonic() - self.last_snapshot_time < self.snapshot_interval:
+            return
+
+        self.last_snapshot_time = time.monotonic()
+        self.database.store_snapshot('bootstrap', self.main_data)
+        self.database.store_snapshot('fixtures', self.fixtures)
+        self.database.store_snapshot('current_gameweek', self.current_gameweek_data)
 
     def update_current_gameweek(self) -> int:
         """
@@ -182,25 +730,7 @@ class FplApi:
 
         :return: Current Gameweek
         """
-        # Go through all gameweeks
-        for i in range(GAMEWEEK_COUNT):
-            # Keep going through gameweeks until the current one is found
-            if self.main_data["events"][i]["is_current"]:
-                # Return current gameweek
-                self.gameweek = i + 1
-                return self.gameweek
-
-        # Not sure how if there's no current gameweek? (I'm not sure how the api works yet so i'll leave this here)
-        # If there's no current use the previous one
-        for i in range(GAMEWEEK_COUNT):
-            # Keep going through gameweeks until the previous one is found
-            if self.main_data["events"][i]["is_previous"]:
-                # Return current gameweek
-                self.gameweek = i + 1
-                return self.gameweek
-
-        # If all gameweeks finished, return gameweek 38
-        self.gameweek = GAMEWEEK_COUNT
+        self.gameweek = find_current_gameweek(self.main_data["events"])
         return self.gameweek
 
     def update_current_gameweek_data(self):
@@ -222,6 +752,37 @@ class FplApi:
 
         # Fetch api data, convert it to dictionary using, and store it
         self.fixtures = self.access_fpl_api("/fixtures/")
+        self.update_fixture_indexes()
+        self.update_fixture_difficulty()
+        self.update_team_scores()
+
+    def update_fixture_indexes(self):
+        """
+        Index fixtures by id, by the teams playing in them and by gameweek.
+        Fixtures keep their original order in each index
+        """
+        fixture_by_id = {}
+        fixtures_by_team = {team["id"]: [] for team in self.team_list}
+        fixtures_by_gameweek = {}
+
+        for fixture in self.fixtures:
+            fixture_by_id[fixture["id"]] = fixture
+            fixtures_by_team.setdefault(fixture["team_h"], []).append(fixture)
+            fixtures_by_team.setdefault(fixture["team_a"], []).append(fixture)
+            # Unscheduled fixtures have no gameweek, and are stored under None
+            fixtures_by_gameweek.setdefault(fixture["event"], []).append(fixture)
+
+        self.fixture_by_id = fixture_by_id
+        self.fixtures_by_team = fixtures_by_team
+        self.fixtures_by_gameweek = fixtures_by_gameweek
+
+    def update_fixture_difficulty(self) -> FixtureDifficultyMatrix:
+        """
+        Rebuild the difficulty matrix of every team's fixtures, used by the fixture planner
+        :return: The new FixtureDifficultyMatrix
+        """
+        self.fixture_difficulty = FixtureDifficultyMatrix(self.team_list, self.fixtures, GAMEWEEK_COUNT)
+        return self.fixture_difficulty
 
     def update_main_data(self):
         """
@@ -246,19 +807,65 @@ class FplApi:
         :return:
         """
         self.player_list = self.main_data["elements"]
+
+        players_by_team = {team["id"]: [] for team in self.team_list}
+        for player in self.player_list:
+            players_by_team.setdefault(player["team"], []).append(player)
+
+        self.player_by_id = {player["id"]: player for player in self.player_list}
+        self.players_by_team = players_by_team
+        self.player_table = PlayerTable(self.player_list)
         return self.player_list
 
     def update_playername_id_dict(self) -> dict:
         """
-        Creates and updates a dictionary that maps all player ids to their last name
+        Creates and updates a dictionary that maps all player ids to their last name,
+        and the fuzzy search index of player names
         :return: Returns the dictionary
         """
 
         self.playername_id_dict = {player["id"]: player["web_name"] for player in
                                    self.player_list}
+        self.player_search_index = PlayerSearchIndex(self.player_list)
 
         return self.playername_id_dict
 
+    def update_team_scores(self) -> dict:
+        """
+        Calculate the fpl score, and the stats it is made from, of every team.
+        Uses one pass over players and one over fixtures
+        :return: Dictionary mapping team id to scores
+        """
+        team_totals = {team["id"]: {'total_form': 0, 'total_points': 0, 'matches_played': 0}
+                       for team in self.team_list}
+
+        for player in self.player_list:
+            totals = team_totals[player["team"]]
+            totals['total_form'] += float(player["form"])
+            totals['total_points'] += player["total_points"]
+
+        for fixture in self.fixtures:
+            if fixture['started']:
+                team_totals[fixture['team_h']]['matches_played'] += 1
+                team_totals[fixture['team_a']]['matches_played'] += 1
+
+        team_scores = {}
+        for team in self.team_list:
+            totals = team_totals[team["id"]]
+
+            if totals['matches_played']:
+                scaled_points = (totals['total_points'] / totals['matches_played']) * self.gameweek
+            else:
+                scaled_points = 0
+
+            # The geometric mean between total points, and the total points if form was used
+            fpl_score = (scaled_points * totals['total_form'] * self.gameweek)**0.5
+            team_scores[team["id"]] = totals | {'fpl_score': fpl_score,
+                                                'team': team["name"]}
+
+        self.team_scores = team_scores
+        return self.team_scores
+
     def update_team_list(self) -> list:
         """
         Update the list of teams, returning the list too
@@ -268,6 +875,9 @@ class FplApi:
         :return:
         """
         self.team_list = self.main_data["teams"]
+        self.team_by_id = {team["id"]: team for team in self.team_list}
+        self.team_by_name = {team["name"]: team for team in self.team_list}
+        self.team_by_code = {team["code"]: team for team in self.team_list}
         return self.team_list
 
     def view_fixtures_for_team(self, team: Union[str, int]) -> dict:
@@ -284,27 +894,43 @@ class FplApi:
         results = []
         fixtures = []
 
-        # Go through all fixtures, check if the team plays in them
-        # And them add the them either to results or fixtures
-        for fixture in self.fixtures:
-            if team_id == fixture['team_h'] or team_id == fixture['team_a']:
-                if fixture['started']:
-                    results.append(fixture)
-                else:
-                    fixtures.append(fixture)
+        # Go through the team's fixtures, adding them either to results or fixtures
+        for fixture in self.fixtures_by_team.get(team_id, []):
+            if fixture['started']:
+                results.append(fixture)
+            else:
+                fixtures.append(fixture)
 
         return {
             'results': results,
             'fixtures': fixtures
         }
 
-    def view_match(self, fixture_id: int) -> dict:
+    def view_easiest_fixture_runs(self, start_gameweek: int = 0, length: int = 5) -> dict:
+        """
+        Rank all teams by how easy their fixtures are over a run of gameweeks
+        :param start_gameweek: First gameweek of run. Defaults to the next gameweek
+        :param length: Number of gameweeks in run
+        :return: Dictionary with the first and last gameweek of the run, kept inside the season,
+        and the runs of every team, easiest first, as from FixtureDifficultyMatrix.easiest_runs
+        """
+        if start_gameweek == 0:
+            start_gameweek = min(self.gameweek + 1, GAMEWEEK_COUNT)
 
-        for fixture in self.fixtures:
-            if fixture["id"] == fixture_id:
-                return fixture
+        start_gameweek, end_gameweek = self.fixture_difficulty.clamp_run(start_gameweek, length)
+        return {
+            'start_gameweek': start_gameweek,
+            'end_gameweek': end_gameweek,
+            'runs': self.fixture_difficulty.easiest_runs(start_gameweek, length)
+        }
 
-        return {}
+    def view_match(self, fixture_id: int) -> dict:
+        """
+        View a fixture or result
+        :param fixture_id: Id of fixture
+        :return: Fixture, or empty dictionary if it doesn't exist
+        """
+        return self.fixture_by_id.get(fixture_id, {})
 
     def view_player(self, player_id: int, matches: bool = False, no_api=False) -> dict:
         """
@@ -318,21 +944,35 @@ class FplApi:
         :param matches: To include match history or not
         :return:
         """
+        player_matches = None if no_api else self.get_player_history(player_id)
+        return self._build_player_profile(player_id, player_matches, matches)
 
-        player_profile = {}
-
+    async def view_player_async(self, player_id: int, matches: bool = False) -> dict:
+        """
+        Awaitable version of view_player
+        :param player_id: Id of player - this is the fpl mandated id
+        :param matches: To include match history or not
+        :return:
+        """
+        player_matches = await self.get_player_history_async(player_id)
+        return self._build_player_profile(player_id, player_matches, matches)
 
-        for player in self.player_list:
-            if player["id"] == player_id:
-                player_profile = player
+    def _build_player_profile(self, player_id: int, player_matches: dict = None, matches: bool = False) -> dict:
+        """
+        Combine a player's bootstrap data with their element summary
+        :param player_id: Id of player
+        :param player_matches: Element summary of player, or None if it wasn't fetched
+        :param matches: To include match history or not
+        :return: Player profile
+        """
+        player_profile = self.player_by_id.get(player_id, {})
 
         full_name = player_profile["first_name"] + " " + player_profile["second_name"]
         player_position_num = player_profile["element_type"] -1
         position = self.main_data["element_types"][player_position_num]["singular_name"]
         position_short = self.main_data["element_types"][player_position_num]["singular_name_short"]
 
-        if not no_api:
-            player_matches = self.get_player_history(player_id)
+        if player_matches is not None:
             first_gameweek = player_matches["history"][0]["round"]
             player_profile = player_profile | {'first_gameweek': first_gameweek}
         player_profile = player_profile | {'full_name': full_name,
@@ -356,12 +996,238 @@ class FplApi:
             gameweek = self.gameweek
 
         gameweek_data = self.get_gameweek_player_data(gameweek)
+        return self._find_gameweek_points(player_id, self.index_gameweek_data(gameweek, gameweek_data))
 
-        for player in gameweek_data["elements"]:
-            if player_id == player["id"]:
-                if player["explain"]:
-                    return player["explain"][0]["stats"]
-        return {}
+    @staticmethod
+    def _find_gameweek_points(player_id: int, gameweek_index: dict, fixture_id: int = None) -> dict:
+        """
+        Find a player's points breakdown in indexed live gameweek data
+        :param player_id: Id of player
+        :param gameweek_index: Live gameweek data indexed by player id
+        :param fixture_id: Match to find the breakdown for, defaults to the player's first match
+        :return: Points breakdown
+        """
+        player = gameweek_index.get(player_id)
+        if player is None or not player["explain"]:
+            return {}
+
+        for explanation in player["explain"]:
+            if explanation["fixture"] == fixture_id:
+                return explanation["stats"]
+        return player["explain"][0]["stats"]
+
+    async def view_player_gameweek_async(self, player_id: int, gameweek: int = 0) -> dict:
+        """
+        View a player's profile, with their match and points breakdown on a gameweek.
+        If the player didn't play on the gameweek, their closest earlier match is used.
+        Only needs one element summary and one live gameweek download
+        :param player_id: Id of player
+        :param gameweek: Gameweek to view
+        :return: Dictionary with the player's profile, the gameweek used, their match and points breakdown
+        """
+        if gameweek == 0:
+            gameweek = self.gameweek
+
+        player_matches = await self.get_player_history_async(player_id)
+        match = self._find_closest_match(player_matches["history"], gameweek)
+        gameweek = match.get("round", gameweek)
+
+        gameweek_data = await self.get_gameweek_player_data_async(gameweek)
+        return self._build_player_gameweek(player_id, player_matches, match,
+                                           self.index_gameweek_data(gameweek, gameweek_data), gameweek)
+
+    def _build_player_gameweek(self, player_id: int, player_matches: dict, match: dict,
+                               gameweek_index: dict, gameweek: int) -> dict:
+        """
+        Combine the parts of view_player_gameweek_async into one dictionary
+        :param player_id: Id of player
+        :param player_matches: Element summary of player
+        :param match: Match the player played on the gameweek
+        :param gameweek_index: Live gameweek data indexed by player id
+        :param gameweek: Gameweek of match
+        :return: Dictionary with the player's profile, the gameweek used, their match and points breakdown
+        """
+        return {
+            'player': self._build_player_profile(player_id, player_matches),
+            'gameweek': gameweek,
+            'match': match,
+            'points': self._find_gameweek_points(player_id, gameweek_index, match.get("fixture"))
+        }
+
+    @staticmethod
+    def _find_closest_match(player_matches: list, gameweek: int) -> dict:
+        """
+        Find the player's match on a gameweek, or their latest match before it if they didn't play.
+        If they hadn't played yet, their first match is used
+        :param player_matches: History list from a player's element summary
+        :param gameweek: Gameweek to find
+        :return: Data for player on gameweek, or empty dictionary if they have never played
+        """
+        closest_match = {}
+        for match in player_matches:
+            if match["round"] > gameweek:
+                break
+            # Keep the first match of a double gameweek
+            if match["round"] != closest_match.get("round"):
+                closest_match = match
+
+        if not closest_match and player_matches:
+            return player_matches[0]
+        return closest_match
+
+    async def view_gameweek_points_async(self, gameweek: int = 0) -> dict:
+        """
+        View every player's total points on a gameweek, from one live gameweek download.
+        Points from all of a player's matches in a double gameweek are included
+        :param gameweek: Gameweek to view points for
+        :return: Dictionary mapping player id to points, or None if the player had no match
+        """
+        if gameweek == 0:
+            gameweek = self.gameweek
+
+        gameweek_data = await self.get_gameweek_player_data_async(gameweek)
+        return self._points_from_index(self.index_gameweek_data(gameweek, gameweek_data))
+
+    def index_gameweek_data(self, gameweek: int, gameweek_data: dict) -> dict:
+        """
+        Index live gameweek data by player id. The index is kept and reused for as long
+        as the same live data is returned from the cache
+        :param gameweek: Gameweek of data
+        :param gameweek_data: Data from /event/{gameweek}/live/
+        :return: Dictionary mapping player id to their live data
+        """
+        stored_data, gameweek_index = self.gameweek_data_indexes.get(gameweek, (None, None))
+        if stored_data is gameweek_data:
+            return gameweek_index
+
+        live_players = gameweek_data.get("elements", []) if isinstance(gameweek_data, dict) else []
+        gameweek_index = {player["id"]: player for player in live_players}
+        self.gameweek_data_indexes[gameweek] = (gameweek_data, gameweek_index)
+        return gameweek_index
+
+    @staticmethod
+    def _points_from_index(gameweek_index: dict) -> dict:
+        """
+        Get total points of all players from indexed live gameweek data
+        :param gameweek_index: Live gameweek data indexed by player id
+        :return: Dictionary mapping player id to points, or None if the player had no match
+        """
+        return {player_id: player["stats"]["total_points"] if player["explain"] else None
+                for player_id, player in gameweek_index.items()}
+
+    def live_scorer(self, gameweek: int, gameweek_data: dict) -> LiveScorer:
+        """
+        Get the LiveScorer for a gameweek. It is only rebuilt when the live data changes
+        :param gameweek: Gameweek of data
+        :param gameweek_data: Data from /event/{gameweek}/live/
+        :return: LiveScorer for gameweek
+        """
+        stored_data, scorer = self.live_scorers.get(gameweek, (None, None))
+        if stored_data is gameweek_data:
+            return scorer
+
+        scorer = LiveScorer(gameweek_data, self.player_list, self.fixtures_by_gameweek.get(gameweek, []))
+        self.live_scorers[gameweek] = (gameweek_data, scorer)
+        return scorer
+
+    async def score_teams_async(self, teams: list, gameweek: int = 0) -> list:
+        """
+        Calculate the live points of fpl teams, including automatic substitutions, vice captaincy and chips.
+        All teams are scored together, from one live gameweek download
+        :param teams: List of picks responses, from get_fpl_team
+        :param gameweek: Gameweek of picks
+        :return: List of scores, as from LiveScorer.score
+        """
+        if gameweek == 0:
+            gameweek = self.gameweek
+
+        gameweek_data = await self.get_gameweek_player_data_async(gameweek)
+        return self.live_scorer(gameweek, gameweek_data).score(teams)
+
+    async def view_live_scores_async(self, manager_ids: list, gameweek: int = 0) -> dict:
+        """
+        View the live points of many managers at once, e.g. a page of a league, scored together in one pass
+        :param manager_ids: Ids of fpl managers
+        :param gameweek: Gameweek to score
+        :return: Dictionary mapping manager id to score, as from LiveScorer.score.
+        Managers without a team on the gameweek, or whose team couldn't be downloaded, are left out.
+        Empty if the live data couldn't be downloaded
+        """
+        if gameweek == 0:
+            gameweek = self.gameweek
+
+        try:
+            gameweek_data = await self.get_gameweek_player_data_async(gameweek)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            return {}
+        # Errors from the api have no players, and would score everyone nothing
+        if not isinstance(gameweek_data, dict) or "elements" not in gameweek_data:
+            return {}
+
+        teams = await asyncio.gather(*(self.get_fpl_team_async(manager_id, gameweek) for manager_id in manager_ids),
+                                     return_exceptions=True)
+
+        scored_managers = []
+        for manager_id, team in zip(manager_ids, teams):
+            if isinstance(team, (aiohttp.ClientError, asyncio.TimeoutError, ValueError)):
+                continue
+            elif isinstance(team, BaseException):
+                raise team
+            elif isinstance(team, dict) and 'picks' in team:
+                scored_managers.append((manager_id, team))
+
+        scores = self.live_scorer(gameweek, gameweek_data).score([team for _, team in scored_managers])
+        return {manager_id: score for (manager_id, _), score in zip(scored_managers, scores)}
+
+    def view_projected_points(self, start_gameweek: int = 0, horizon: int = 5):
+        """
+        Project every player's points over the next few gameweeks, from form, minutes and fixtures
+        :param start_gameweek: First gameweek to project. Defaults to the next gameweek
+        :param horizon: Number of gameweeks to project
+        :return: Array of projected points, in the same order as player_table
+        """
+        if start_gameweek == 0:
+            start_gameweek = min(self.gameweek + 1, GAMEWEEK_COUNT)
+
+        team_matches_played = {team_id: scores['matches_played'] for team_id, scores in self.team_scores.items()}
+        return projected_points(self.player_table, self.fixture_difficulty, team_matches_played,
+                                start_gameweek, horizon)
+
+    async def view_transfer_suggestions_async(self, manager_id: int, free_transfers: int = 1, horizon: int = 5,
+                                              executor=None) -> dict:
+        """
+        Suggest the best one or two transfers for a manager's current squad, to gain the most projected points
+        over the next few gameweeks. The search runs in an executor, so it doesn't block the event loop
+        :param manager_id: Id of fpl manager
+        :param free_transfers: Number of transfers the manager can make without taking a hit
+        :param horizon: Number of gameweeks to project points over
+        :param executor: Executor to search in, e.g. a ProcessPoolExecutor. The loop's default executor if None
+        :return: Dictionary with the bank, the gameweeks projected, suggestions as from suggest_transfers,
+        and the projected points of every player in them. Empty if the manager has no team
+        """
+        team = await self.get_fpl_team_async(manager_id)
+        if 'picks' not in team:
+            return {}
+
+        start_gameweek = min(self.gameweek + 1, GAMEWEEK_COUNT)
+        projections = self.view_projected_points(start_gameweek, horizon)
+        squad_ids = [pick['element'] for pick in team['picks']]
+        bank = team['entry_history']['bank']
+
+        suggestions = await asyncio.get_running_loop().run_in_executor(
+            executor, suggest_transfers, squad_ids, bank, free_transfers, self.player_table.ids,
+            self.player_table.positions, self.player_table.teams, self.player_table.column("now_cost"), projections)
+
+        projection_by_id = dict(zip(self.player_table.ids.tolist(), projections.tolist()))
+        return {
+            'bank': bank,
+            'start_gameweek': start_gameweek,
+            'end_gameweek': min(start_gameweek + horizon - 1, GAMEWEEK_COUNT),
+            'suggestions': suggestions,
+            'projected_points': {player_id: projection_by_id[player_id]
+                                 for suggestion in suggestions
+                                 for player_id in suggestion['out'] + suggestion['in']}
+        }
 
     def view_player_on_gameweek(self, player_id: int, gameweek: int = 0):
         """
@@ -386,6 +1252,16 @@ class FplApi:
 
         return {}
 
+    def search_players(self, name: str, limit: int = 20) -> list:
+        """
+        Find players with names similar to the one given, by web name, full name or surname.
+        Accents are ignored, and players sharing a name are all included
+        :param name: Name to search for
+        :param limit: Maximum number of players to return
+        :return: List of player ids, best match first
+        """
+        return self.player_search_index.search(name, limit=limit)
+
     def view_team(self, team: Union[int, str]) -> dict:
         """
         View basic team info, in processed dictionary
@@ -402,12 +1278,9 @@ class FplApi:
         if isinstance(team, int):
             team_selected = self.team_list[team]
 
-        # If team is given as a name, go through list of teams
-        # Until one with the same name is found
+        # If team is given as a name, look it up by name
         elif isinstance(team, str):
-            for team_item in self.team_list:
-                if team_item["name"] == team:
-                    team_selected = team_item
+            team_selected = self.team_by_name.get(team, {})
 
         else:
             return {}
@@ -428,31 +1301,20 @@ class FplApi:
     def view_team_fpl_score(self, team: Union[int, str]) -> dict:
         """
         View the fpl score of a team, and other stats, calculated using the geometric mean between
-        the total fpl points from a team, and the total fpl points if all gameweeks had current form
+        the total fpl points from a team, and the total fpl points if all gameweeks had current form.
+        Scores are calculated when data is updated, so this is just a lookup
         :param team: Team to score
-        :return: Total form, Total points and fpl_score
+        :return: Total form, Total points, matches played and fpl_score
         """
-        player_list = self.view_team_players(team)
-        matches = self.view_fixtures_for_team(team)
-        matches_played = len(matches['results'])
-
-        total_form = 0
-        total_points = 0
-        for player in player_list:
-            total_form += float(player["form"])
-            total_points += player["total_points"]
-
-        scaled_points = (total_points/matches_played) * self.gameweek
-
-        # The geometric mean between total points, and the total points if form was used
-        fpl_score = (scaled_points * total_form * self.gameweek)**0.5
-        return {
-            'total_form': total_form,
-            'total_points': total_points,
-            'fpl_score': fpl_score,
-            'team':team
-        }
+        team_id = self.view_team(team)["id"]
+        return self.team_scores[team_id] | {'team': team}
 
+    def view_team_leaderboard(self) -> list:
+        """
+        View the fpl scores of all teams, best first
+        :return: List of team scores, as from view_team_fpl_score
+        """
+        return sorted(self.team_scores.values(), key=lambda d: d['fpl_score'], reverse=True)
 
     def view_team_logo(self, team: Union[int, str]) -> str:
         """
@@ -488,25 +1350,163 @@ class FplApi:
         :return:
         """
         team_id = self.view_team(team)["id"]
-        team_player_list = []
-        for player in self.player_list:
-            if player["team"] == team_id:
-                team_player_list.append(player)
-
-        team_player_list = sorted(team_player_list, key=lambda d: float(d[sorting_key]), reverse=True)
+        team_player_list = self.player_table.top(sorting_key, team=team_id)
         return team_player_list
 
-    async def regular_updater(self, update_interval: int = 60):
+    def view_top_players(self, stat: str, position: Union[int, str] = None, team: Union[int, str] = None,
+                         min_cost: float = None, max_cost: float = None, limit: int = 10) -> list:
+        """
+        View the players with the highest value of any stat, e.g. top 10 midfielders by value_form under £7m
+        :param stat: Stat to sort by, as named in the api
+        :param position: Position to pick from, as its id or short name (e.g. 'MID'). None for all positions
+        :param team: Team to pick from, as name or list position. None for all teams
+        :param min_cost: Minimum cost in millions
+        :param max_cost: Maximum cost in millions
+        :param limit: Maximum number of players to return
+        :return: List of players, best first
+        """
+        if isinstance(position, str):
+            position = next(element_type["id"] for element_type in self.main_data["element_types"]
+                            if element_type["singular_name_short"] == position)
+        if team is not None:
+            team = self.view_team(team)["id"]
+
+        return self.player_table.top(stat, limit=limit, position=position, team=team,
+                                     min_cost=min_cost, max_cost=max_cost)
+
+    async def view_league_standings_async(self, league_id: int) -> dict:
+        """
+        View the full standings of a classic league, downloading all pages at once,
+        at most league_page_concurrency at a time.
+        Standings are kept for the current gameweek, and only downloaded again when the league's
+        first page says they have been updated. Pages that fail are tried again, and if they still fail
+        the standings kept from last time are used
+        :param league_id: Id of league
+        :return: Dictionary with league info and list of all standings, or the api's error if there was one
+        :raises FplApiUnavailable: If a page couldn't be downloaded and no standings were kept from last time
+        """
+        semaphore = asyncio.Semaphore(self.league_page_concurrency)
+
+        async def fetch_page(page: int) -> dict:
+            for attempt in range(self.league_page_attempts):
+                if attempt:
+                    await asyncio.sleep(2 ** (attempt - 1))
+                async with semaphore:
+                    try:
+                        league_page = await self.get_fpl_league_async(league_id, page)
+                    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                        continue
+                # Leagues that don't exist are not found, which isn't worth trying again
+                if isinstance(league_page, dict) and ('standings' in league_page or page == 1):
+                    return league_page
+            raise FplApiUnavailable(f"Couldn't download page {page} of league {league_id}")
+
+        cached_standings = self.league_standings_cache.get(league_id)
+        try:
+            first_page = await fetch_page(1)
+            if 'standings' not in first_page:
+                return first_page
+
+            last_updated = first_page.get('last_updated_data')
+            if (cached_standings is not None and cached_standings['gameweek'] == self.gameweek and
+                    last_updated is not None and cached_standings['last_updated'] == last_updated):
+                return cached_standings
+
+            pages = await self._fetch_league_pages(first_page, fetch_page, cached_standings)
+        except FplApiUnavailable:
+            # Out of date standings are better than none
+            if cached_standings is not None:
+                return cached_standings
+            raise
+
+        league_standings = {
+            'league': first_page['league'],
+            'standings': [result for page in pages for result in page['standings']['results']],
+            'gameweek': self.gameweek,
+            'last_updated': last_updated,
+            'page_count': len(pages)
+        }
+        self.league_standings_cache.set(league_id, league_standings, None)
+        return league_standings
+
+    async def _fetch_league_pages(self, first_page: dict, fetch_page, cached_standings: Optional[dict]) -> list:
+        """
+        Download every page of a league's standings after the first, keeping up to league_page_concurrency
+        downloading. Pages up to as many as the league had last time are downloaded first. Past those,
+        only a few pages beyond the ones found so far are started at once, so few empty pages past the end
+        are downloaded. Once a page says it is the last, no more are started
+        :param first_page: First page of standings
+        :param fetch_page: Async function downloading a page, given its number
+        :param cached_standings: Standings kept from last time, if any
+        :return: List of pages, in order, up to the last
+        :raises FplApiUnavailable: If a page couldn't be downloaded
+        """
+        known_page_count = cached_standings['page_count'] if cached_standings is not None else 1
+        pages = {1: first_page}
+        last_page = None if first_page['standings']['has_next'] else 1
+        next_page = 2
+        # Maps task downloading a page to its page number
+        downloads = {}
+
+        try:
+            while last_page is None or any(page not in pages for page in range(2, last_page + 1)):
+                if last_page is not None:
+                    start_limit = last_page
+                elif known_page_count not in pages:
+                    # The league probably still has as many pages as last time
+                    start_limit = known_page_count
+                else:
+                    # Past the pages it had last time, looking further ahead the more pages are found in a row.
+                    # Pages already started when the last page is found are wasted, so this grows slowly
+                    found_in_row = 1
+                    while found_in_row + 1 in pages:
+                        found_in_row += 1
+                    start_limit = found_in_row + max(1, min(self.league_page_concurrency, found_in_row // 2))
+                while next_page <= start_limit and len(downloads) < self.league_page_concurrency:
+                    downloads[asyncio.ensure_future(fetch_page(next_page))] = next_page
+                    next_page += 1
+
+                done, _ = await asyncio.wait(downloads, return_when=asyncio.FIRST_COMPLETED)
+                for download in done:
+                    page = downloads.pop(download)
+                    league_page = download.result()
+                    if last_page is not None and page > last_page:
+                        continue
+                    pages[page] = league_page
+                    if not league_page['standings']['has_next']:
+                        last_page = page if last_page is None else min(last_page, page)
+        finally:
+            # Pages past the last are not needed, and nothing is needed if a page failed
+            for download in downloads:
+                download.cancel()
+
+        return [pages[page] for page in range(1, last_page + 1)]
+
+    async def regular_updater(self, update_interval: int = 60, manager_refresher=None):
         """
         Refresh data every fixed interval, to keep data updated.
         Defaults to one minute.
         :param update_interval: Number of seconds to wait before updating
+        :param manager_refresher: ManagerRefresher to start rounds of manager refreshes with, if any
         """
+        # Data loaded from a snapshot may be old, so is updated straight away
+        wait_first = not self.loaded_from_snapshot
         while True:
-            await asyncio.sleep(update_interval)
+            if wait_first:
+                await asyncio.sleep(update_interval)
+            wait_first = True
             try:
                 print('Updating!')
-                self.update_all()
-            except requests.exceptions.ConnectionError:
+                await self.update_all_async()
+                # Started after updating, so picks are refreshed for the right gameweek
+                if manager_refresher is not None:
+                    manager_refresher.tick()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.failed_update_count += 1
+                time_info = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+                print(f"Connection Error! Skipping Upgrade! At {time_info}")
+            except (FplApiUnavailable, ValueError) as e:
+                # e.g. during maintenance, when responses are errors or html pages instead of data
+                self.failed_update_count += 1
                 time_info = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-                print(f"Connection Error! Skipping Upgrade! At {time_info}")
\ No newline at end of file
+                print(f"Fpl api unavailable ({e})! Skipping Upgrade! At {time_info}")
\ No newline at end of file
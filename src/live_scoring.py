@@ -0,0 +1,144 @@
+import numpy as np
+
+SQUAD_SIZE = 15
+STARTING_SIZE = 11
+GOALKEEPER, DEFENDER, MIDFIELDER, FORWARD = 1, 2, 3, 4
+
+# Fewest players of each outfield position a starting eleven may have
+MINIMUM_STARTERS = {DEFENDER: 3, MIDFIELDER: 2, FORWARD: 1}
+
+
+class LiveScorer:
+    """
+    Scores fpl teams from one gameweek's live data, applying captaincy, chips and automatic substitutions.
+    Many teams are scored at once, as arrays with one row per team and one column per pick
+    """
+
+    def __init__(self, gameweek_data: dict, player_list: list, gameweek_fixtures: list):
+        """
+        Prepare live data of a gameweek for scoring
+        :param gameweek_data: Data from /event/{gameweek}/live/
+        :param player_list: List of players from the bootstrap data
+        :param gameweek_fixtures: Fixtures of the gameweek
+        """
+        # Errors from the api have no players, so everyone scores nothing
+        live_players = gameweek_data.get("elements", []) if isinstance(gameweek_data, dict) else []
+
+        max_player_id = max([player["id"] for player in player_list] +
+                            [player["id"] for player in live_players] + [0])
+
+        # Arrays indexed by player id
+        self.points = np.zeros(max_player_id + 1, dtype=np.int64)
+        self.minutes = np.zeros(max_player_id + 1, dtype=np.int64)
+        self.positions = np.zeros(max_player_id + 1, dtype=np.int64)
+        self.teams = np.zeros(max_player_id + 1, dtype=np.int64)
+
+        for player in live_players:
+            self.points[player["id"]] = player["stats"]["total_points"]
+            self.minutes[player["id"]] = player["stats"]["minutes"]
+
+        for player in player_list:
+            self.positions[player["id"]] = player["element_type"]
+            self.teams[player["id"]] = player["team"]
+
+        # A team is done once all its matches have finished. Teams without a match are done straight away
+        max_team_id = int(self.teams.max())
+        team_done = np.ones(max_team_id + 1, dtype=bool)
+        for fixture in gameweek_fixtures:
+            finished = fixture.get("finished") or fixture.get("finished_provisional", False)
+            for team in (fixture["team_h"], fixture["team_a"]):
+                if team <= max_team_id:
+                    team_done[team] &= bool(finished)
+
+        # Players who didn't play, and can no longer play, this gameweek
+        self.missed = (self.minutes == 0) & team_done[self.teams]
+
+    def score(self, teams: list) -> list:
+        """
+        Score fpl teams
+        :param teams: List of picks responses, from /entry/{id}/event/{gameweek}/picks/
+        :return: List of dictionaries with each team's points, transfer cost, total,
+        the ids of the players whose points count, and the id of the player captaining
+        """
+        if not teams:
+            return []
+
+        rows = np.arange(len(teams))
+        picks = np.array([[pick["element"] for pick in team["picks"]] for team in teams], dtype=np.int64)
+        captain_slots = np.array([next(i for i, pick in enumerate(team["picks"]) if pick["is_captain"])
+                                  for team in teams])
+        vice_captain_slots = np.array([next(i for i, pick in enumerate(team["picks"]) if pick["is_vice_captain"])
+                                       for team in teams])
+        chips = [team.get("active_chip") for team in teams]
+        bench_boost = np.array([chip == 'bboost' for chip in chips])
+        triple_captain = np.array([chip == '3xc' for chip in chips])
+        transfer_costs = np.array([team.get("entry_history", {}).get("event_transfers_cost", 0) for team in teams])
+
+        points = self.points[picks]
+        positions = self.positions[picks]
+        missed = self.missed[picks]
+        played = self.minutes[picks] > 0
+
+        counted = np.zeros(picks.shape, dtype=bool)
+        counted[:, :STARTING_SIZE] = True
+        counted[bench_boost, STARTING_SIZE:] = True
+
+        self._substitute(counted, positions, missed, played, ~bench_boost)
+
+        # The vice captain takes the armband if the captain missed the gameweek (or was subbed off)
+        captain_missed = missed[rows, captain_slots] | ~counted[rows, captain_slots]
+        vice_captain_available = counted[rows, vice_captain_slots] & ~missed[rows, vice_captain_slots]
+        captain_slots = np.where(captain_missed & vice_captain_available, vice_captain_slots, captain_slots)
+
+        multipliers = counted.astype(np.int64)
+        multipliers[rows, captain_slots] *= np.where(triple_captain, 3, 2)
+
+        team_points = (points * multipliers).sum(axis=1)
+
+        return [{
+            'points': int(team_points[i]),
+            'transfer_cost': int(transfer_costs[i]),
+            'total': int(team_points[i] - transfer_costs[i]),
+            'counted': [int(player_id) for player_id in picks[i][counted[i]]],
+            'captain': int(picks[i][captain_slots[i]])
+        } for i in rows]
+
+    @staticmethod
+    def _substitute(counted, positions, missed, played, can_substitute):
+        """
+        Make automatic substitutions, changing counted in place.
+        Starters who missed the gameweek are replaced by the first bench player, in bench order,
+        who played and keeps the formation valid. Goalkeepers can only be replaced by the bench goalkeeper
+        :param counted: Boolean array of which picks' points count
+        :param positions: Position of each pick
+        :param missed: Boolean array of which picks missed the gameweek
+        :param played: Boolean array of which picks played
+        :param can_substitute: Boolean array of which teams can make substitutions (not bench boosting)
+        """
+        bench_goalkeeper_slot = STARTING_SIZE
+        outfield_bench_slots = range(STARTING_SIZE + 1, SQUAD_SIZE)
+
+        for starter_slot in range(STARTING_SIZE):
+            needs_substitute = can_substitute & counted[:, starter_slot] & missed[:, starter_slot]
+            starter_positions = positions[:, starter_slot]
+
+            goalkeeper_substitute = (needs_substitute & (starter_positions == GOALKEEPER) &
+                                     played[:, bench_goalkeeper_slot] & ~counted[:, bench_goalkeeper_slot])
+            counted[goalkeeper_substitute, starter_slot] = False
+            counted[goalkeeper_substitute, bench_goalkeeper_slot] = True
+
+            needs_substitute &= starter_positions != GOALKEEPER
+            for bench_slot in outfield_bench_slots:
+                bench_positions = positions[:, bench_slot]
+                substitute = needs_substitute & played[:, bench_slot] & ~counted[:, bench_slot]
+
+                # Check the formation would still be valid after swapping
+                for position, minimum in MINIMUM_STARTERS.items():
+                    starters_in_position = (counted & (positions == position)).sum(axis=1)
+                    starters_after = (starters_in_position - (starter_positions == position) +
+                                      (bench_positions == position))
+                    substitute &= starters_after >= minimum
+
+                counted[substitute, starter_slot] = False
+                counted[substitute, bench_slot] = True
+                needs_substitute &= ~substitute
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import aiohttp
+
+
+class ManagerRefresher:
+    """
+    Keeps the data of every manager with a stored fpl id warm in the background, so their commands are often
+    answered from the cache, and the first command after a new gameweek doesn't wait on the fpl api.
+    Refreshed data is cached for the endpoint's usual time, then served stale until the next round while it is
+    downloaded again in the background, so commands between rounds don't wait on the fpl api either.
+    Each round is spread out across the refresh interval, with a limit on how many managers
+    are refreshed at once and how fast requests are started
+    """
+
+    def __init__(self, fpl_api, database, refresh_interval: float = 600, max_concurrency: int = 4,
+                 requests_per_second: float = 2):
+        """
+        Initialises new ManagerRefresher
+        :param fpl_api: FplApi to refresh data of
+        :param database: FplDatabase holding the fpl ids of registered users
+        :param refresh_interval: Number of seconds between the start of each round of refreshes
+        :param max_concurrency: Maximum number of managers being refreshed at once
+        :param requests_per_second: Maximum rate requests to the fpl api are started at
+        """
+        self.fpl_api = fpl_api
+        self.database = database
+        self.refresh_interval = refresh_interval
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+
+        self.round_task = None
+        self.last_round_start = None
+        # Number of seconds refreshed data is served stale for, long enough to last until the next round
+        self.stale_ttl = 2 * refresh_interval
+
+        self.rounds_completed = 0
+        self.managers_refreshed = 0
+        self.failed_refreshes = 0
+        self.last_round_duration = 0.0
+
+    def manager_endpoints(self, manager_id: int) -> list:
+        """
+        Get the endpoints kept fresh for a manager
+        :param manager_id: Id of fpl manager
+        :return: List of endpoints
+        """
+        return [f"/entry/{str(manager_id)}/",
+                f"/entry/{manager_id}/history/",
+                f"/entry/{manager_id}/transfers/",
+                f"/entry/{manager_id}/event/{self.fpl_api.gameweek}/picks/"]
+
+    def tick(self):
+        """
+        Start a new round of refreshes in the background, if the last one has finished
+        and the refresh interval has passed since it started. Called by FplApi.regular_updater
+        """
+        if self.round_task is not None and not self.round_task.done():
+            return
+        if self.last_round_start is not None and time.monotonic() - self.last_round_start < self.refresh_interval:
+            return
+
+        self.last_round_start = time.monotonic()
+        self.round_task = asyncio.ensure_future(self.refresh_all())
+
+    async def refresh_all(self):
+        """
+        Refresh every registered manager once. Managers are started one at a time, evenly spaced
+        across the refresh interval, or further apart if needed to stay under the request rate
+        """
+        start_time = time.monotonic()
+        manager_ids = sorted(set(self.database.fpl_ids.values()))
+        if not manager_ids:
+            return
+
+        requests_per_manager = len(self.manager_endpoints(0))
+        spacing = max(self.refresh_interval / len(manager_ids), requests_per_manager / self.requests_per_second)
+        # Rounds slowed down by the request rate take longer than the refresh interval
+        self.stale_ttl = 2 * max(self.refresh_interval, spacing * len(manager_ids))
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = []
+        for manager_id in manager_ids:
+            await semaphore.acquire()
+            task = asyncio.ensure_future(self.refresh_manager(manager_id))
+            task.add_done_callback(lambda _: semaphore.release())
+            tasks.append(task)
+            await asyncio.sleep(spacing)
+
+        await asyncio.gather(*tasks)
+        self.rounds_completed += 1
+        self.last_round_duration = time.monotonic() - start_time
+
+    async def refresh_manager(self, manager_id: int):
+        """
+        Download a manager's data again, and cache it until the next round
+        :param manager_id: Id of fpl manager
+        """
+        try:
+            await asyncio.gather(*(self.fpl_api.refresh_fpl_api_async(endpoint, self.stale_ttl)
+                                   for endpoint in self.manager_endpoints(manager_id)))
+            self.managers_refreshed += 1
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            # Left to be fetched on demand instead
+            self.failed_refreshes += 1
+
+    def stats(self) -> dict:
+        """
+        Get counts of refreshes
+        :return: Dictionary of refresh counts
+        """
+        return {
+            'registered_managers': len(set(self.database.fpl_ids.values())),
+            'rounds_completed': self.rounds_completed,
+            'managers_refreshed': self.managers_refreshed,
+            'failed_refreshes': self.failed_refreshes,
+            'last_round_duration': self.last_round_duration,
+            'stale_ttl': self.stale_ttl,
+            'round_running': self.round_task is not None and not self.round_task.done()
+        }
@@ -0,0 +1,208 @@
+import bisect
+import contextvars
+import functools
+import os
+import re
+import time
+from collections import defaultdict
+
+# Upper bounds, in seconds, of the buckets latencies are counted in
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Ids in endpoints are replaced, so there is one histogram per kind of endpoint instead of one per id
+ENDPOINT_ID_PATTERN = re.compile(r"\d+")
+
+# Seconds the running slash command has spent waiting on its user, e.g. for a button to be pressed.
+# Holds a one item list, so it can be added to from anywhere in the command's task
+_command_waiting_time = contextvars.ContextVar('command_waiting_time', default=None)
+
+
+def endpoint_label(endpoint: str) -> str:
+    """
+    Get the label an endpoint's latencies are recorded under
+    :param endpoint: Endpoint of fpl api, e.g. '/entry/123/history/'
+    :return: Endpoint with ids replaced, e.g. '/entry/{id}/history/'
+    """
+    return ENDPOINT_ID_PATTERN.sub('{id}', endpoint.split('?')[0])
+
+
+def record_waiting_time(seconds: float):
+    """
+    Exclude time spent waiting on a user from the running slash command's latency
+    :param seconds: Number of seconds spent waiting
+    """
+    waiting_time = _command_waiting_time.get()
+    if waiting_time is not None:
+        waiting_time[0] += seconds
+
+
+class LatencyHistogram:
+    """
+    Counts of how many observations fell into each latency bucket, as used by prometheus
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        """
+        Initialises new, empty LatencyHistogram
+        :param buckets: Upper bounds of buckets, in seconds, in increasing order
+        """
+        self.buckets = buckets
+        # One more count than buckets, for observations bigger than every bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        """
+        Record an observation
+        :param seconds: Latency observed
+        """
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, quantile: float) -> float:
+        """
+        Estimate a quantile, as the upper bound of the bucket it falls in
+        :param quantile: Quantile to estimate, between 0 and 1
+        :return: Estimated latency in seconds, infinity if it is bigger than every bucket, 0 if nothing is recorded
+        """
+        if not self.count:
+            return 0.0
+
+        rank = quantile * self.count
+        cumulative_count = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative_count += count
+            if cumulative_count >= rank:
+                return bound
+        return float('inf')
+
+    def summary(self) -> dict:
+        """
+        Get a short summary of the histogram
+        :return: Dictionary with count, mean, and estimated median and 95th percentile
+        """
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95)
+        }
+
+
+class Metrics:
+    """
+    Collects latency histograms, and reads other components' stats, so they can be shown with /stats
+    or exported in the prometheus text format
+    """
+
+    def __init__(self):
+        """
+        Initialises new Metrics, with nothing recorded
+        """
+        # Maps metric name to a dictionary mapping label value to LatencyHistogram
+        self.histograms = defaultdict(lambda: defaultdict(LatencyHistogram))
+        # Label name of each histogram metric
+        self.histogram_labels = {}
+        # Descriptions of metrics, for prometheus
+        self.descriptions = {}
+        # List of (metric name prefix, function returning a dictionary of numbers), read when exporting
+        self.gauge_sources = []
+
+    def observe(self, name: str, label_name: str, label: str, seconds: float, description: str = ''):
+        """
+        Record a latency
+        :param name: Name of metric, e.g. 'fpl_api_request_seconds'
+        :param label_name: Name of label distinguishing histograms of metric, e.g. 'endpoint'
+        :param label: Value of label
+        :param seconds: Latency observed
+        :param description: Description of metric
+        """
+        self.histogram_labels[name] = label_name
+        if description:
+            self.descriptions[name] = description
+        self.histograms[name][label].observe(seconds)
+
+    def add_gauges(self, prefix: str, stats_function, description: str = ''):
+        """
+        Export the stats of a component as gauges, read every time metrics are exported
+        :param prefix: Prefix of gauge names, e.g. 'fpl_api_cache'
+        :param stats_function: Function taking no arguments, returning a dictionary of numbers
+        :param description: Description of stats
+        """
+        self.gauge_sources.append((prefix, stats_function))
+        if description:
+            self.descriptions[prefix] = description
+
+    def gauges(self) -> dict:
+        """
+        Read every gauge
+        :return: Dictionary mapping prefix to the dictionary of stats read
+        """
+        return {prefix: {key: float(value) for key, value in stats_function().items()
+                         if isinstance(value, (int, float))}
+                for prefix, stats_function in self.gauge_sources}
+
+    def timed_command(self, function):
+        """
+        Decorator recording the latency of a slash command, without the time it spent waiting on its user.
+        Goes under @slash.slash
+        :param function: Slash command function, taking the context first
+        :return: Wrapped function
+        """
+        @functools.wraps(function)
+        async def wrapper(ctx, *args, **kwargs):
+            waiting_time = [0.0]
+            token = _command_waiting_time.set(waiting_time)
+            start_time = time.perf_counter()
+            try:
+                return await function(ctx, *args, **kwargs)
+            finally:
+                _command_waiting_time.reset(token)
+                self.observe('slash_command_seconds', 'command', function.__name__,
+                             time.perf_counter() - start_time - waiting_time[0],
+                             'Time taken to handle slash commands, not counting time waiting on users')
+
+        return wrapper
+
+    def prometheus_text(self) -> str:
+        """
+        Export every metric in the prometheus text format
+        :return: Text of metrics
+        """
+        lines = []
+
+        for name, histograms in self.histograms.items():
+            label_name = self.histogram_labels[name]
+            lines.append(f"# HELP {name} {self.descriptions.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for label, histogram in sorted(histograms.items()):
+                label = label.replace('\\', '\\\\').replace('"', '\\"')
+                cumulative_count = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative_count += count
+                    lines.append(f'{name}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative_count}')
+                lines.append(f'{name}_bucket{{{label_name}="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{{label_name}="{label}"}} {histogram.sum}')
+                lines.append(f'{name}_count{{{label_name}="{label}"}} {histogram.count}')
+
+        for prefix, stats in self.gauges().items():
+            for key, value in stats.items():
+                name = f"{prefix}_{key}"
+                lines.append(f"# HELP {name} {self.descriptions.get(prefix, prefix)}: {key}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus_file(self, path: str = 'metrics.prom'):
+        """
+        Write every metric to a file in the prometheus text format, e.g. for node exporter's textfile collector.
+        The file is replaced at once, so it is never read half written
+        :param path: Path of file
+        """
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'w') as file:
+            file.write(self.prometheus_text())
+        os.replace(temporary_path, path)
@@ -0,0 +1,228 @@
+import asyncio
+import copy
+import time
+from collections import OrderedDict
+
+from discord_slash.utils.manage_components import wait_for_component
+
+from metrics import record_waiting_time
+
+
+class SessionExpired(Exception):
+    """
+    Raised when waiting on a pagination session that has timed out or been closed
+    """
+    pass
+
+
+def disable_components(components: list) -> list:
+    """
+    Make a copy of action rows with every button and select disabled
+    :param components: List of action rows
+    :return: Disabled copy of action rows
+    """
+    disabled_components = copy.deepcopy(components)
+    for action_row in disabled_components:
+        for component in action_row["components"]:
+            component["disabled"] = True
+    return disabled_components
+
+
+class PaginationSession:
+    """
+    One interactive message, waiting for its buttons to be pressed
+    """
+
+    def __init__(self, manager, session_id: int):
+        self.manager = manager
+        self.session_id = session_id
+        self.closed = asyncio.Event()
+        # Maps key to (task building the page, time it was started), oldest first
+        self.prefetched = OrderedDict()
+
+    def prefetch(self, key, coroutine_function, *args):
+        """
+        Start building a page the user is likely to ask for next, in the background.
+        Nothing is started if the session or all sessions together are already prefetching too much
+        :param key: Key identifying the page
+        :param coroutine_function: Async function building the page
+        :param args: Arguments to pass to coroutine_function
+        """
+        if key in self.prefetched or self.closed.is_set():
+            return
+        if self.manager.active_prefetches >= self.manager.max_active_prefetches:
+            return
+
+        while len(self.prefetched) >= self.manager.session_prefetch_limit:
+            _, (oldest_task, _) = self.prefetched.popitem(last=False)
+            oldest_task.cancel()
+
+        task = asyncio.ensure_future(coroutine_function(*args))
+        self.manager.active_prefetches += 1
+        task.add_done_callback(self.manager.prefetch_done)
+        self.prefetched[key] = (task, time.monotonic())
+
+    async def get(self, key, coroutine_function, *args):
+        """
+        Get a page, using the prefetched one if it was started less than prefetch_ttl seconds ago
+        :param key: Key identifying the page
+        :param coroutine_function: Async function building the page
+        :param args: Arguments to pass to coroutine_function
+        :return: The page
+        """
+        task, start_time = self.prefetched.pop(key, (None, None))
+
+        # Pages built from data older than any cached response would be out of date, e.g. live points
+        if task is not None and time.monotonic() - start_time > self.manager.prefetch_ttl:
+            task.cancel()
+            self.manager.prefetch_expired += 1
+            task = None
+
+        if task is not None and not task.cancelled():
+            try:
+                page = await task
+                self.manager.prefetch_hits += 1
+                return page
+            except Exception:
+                # Try again below, in case it was a temporary failure
+                pass
+
+        self.manager.prefetch_misses += 1
+        return await coroutine_function(*args)
+
+    def cancel_prefetches(self):
+        """
+        Stop building any prefetched pages
+        """
+        for task, _ in self.prefetched.values():
+            task.cancel()
+        self.prefetched.clear()
+
+    async def wait_for_component(self, bot, components: list):
+        """
+        Wait for one of the components to be used
+        :param bot: Bot to wait with
+        :param components: Components to wait for
+        :return: Component context of interaction
+        :raises SessionExpired: If nothing happens before the idle timeout, or the session is closed to make room
+        """
+        if self.closed.is_set():
+            raise SessionExpired
+
+        # Refresh position, so the least recently used session is closed first when full
+        self.manager.touch(self)
+
+        component_task = asyncio.ensure_future(
+            wait_for_component(bot, components=components, timeout=self.manager.idle_timeout))
+        closed_task = asyncio.ensure_future(self.closed.wait())
+        start_time = time.perf_counter()
+        done, pending = await asyncio.wait({component_task, closed_task}, return_when=asyncio.FIRST_COMPLETED)
+        # Time spent waiting on the user isn't part of the command's latency
+        record_waiting_time(time.perf_counter() - start_time)
+
+        # Cancelled waiters are removed from the bot's listeners on its next event
+        for task in pending:
+            task.cancel()
+
+        if component_task in done:
+            try:
+                return component_task.result()
+            except asyncio.TimeoutError:
+                self.manager.expired_count += 1
+                raise SessionExpired
+
+        raise SessionExpired
+
+
+class PaginationSessionManager:
+    """
+    Keeps track of all pagination sessions, so they time out when idle
+    and there are never more than max_sessions waiting at once
+    """
+
+    def __init__(self, max_sessions: int = 500, idle_timeout: float = 300,
+                 session_prefetch_limit: int = 2, max_active_prefetches: int = 50, prefetch_ttl: float = 60):
+        """
+        Initialises new PaginationSessionManager
+        :param max_sessions: Maximum number of open sessions. The least recently used is closed to make room
+        :param idle_timeout: Number of seconds a session waits for an interaction before expiring
+        :param session_prefetch_limit: Maximum number of pages each session keeps prefetched
+        :param max_active_prefetches: Maximum number of pages being prefetched at once, across all sessions
+        :param prefetch_ttl: Number of seconds a prefetched page can be used for, the same as fpl api responses
+        """
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.session_prefetch_limit = session_prefetch_limit
+        self.max_active_prefetches = max_active_prefetches
+        self.prefetch_ttl = prefetch_ttl
+        self.sessions = OrderedDict()
+
+        self.active_prefetches = 0
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
+        self.prefetch_expired = 0
+
+        self.next_session_id = 0
+        self.opened_count = 0
+        self.expired_count = 0
+        self.evicted_count = 0
+
+    def open(self) -> PaginationSession:
+        """
+        Start a new session, closing the least recently used one if there are too many
+        :return: New session
+        """
+        while len(self.sessions) >= self.max_sessions:
+            _, oldest_session = self.sessions.popitem(last=False)
+            oldest_session.closed.set()
+            oldest_session.cancel_prefetches()
+            self.evicted_count += 1
+
+        session = PaginationSession(self, self.next_session_id)
+        self.sessions[session.session_id] = session
+        self.next_session_id += 1
+        self.opened_count += 1
+        return session
+
+    def touch(self, session: PaginationSession):
+        """
+        Mark a session as the most recently used
+        :param session: Session used
+        """
+        if session.session_id in self.sessions:
+            self.sessions.move_to_end(session.session_id)
+
+    def close(self, session: PaginationSession):
+        """
+        Finish a session
+        :param session: Session to close
+        """
+        self.sessions.pop(session.session_id, None)
+        session.closed.set()
+        session.cancel_prefetches()
+
+    def prefetch_done(self, task: asyncio.Task):
+        """
+        Called when a prefetch finishes, or is cancelled
+        :param task: Task of prefetch
+        """
+        self.active_prefetches -= 1
+        # Mark any error as seen, as prefetched pages may never be used
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """
+        Get counts of sessions
+        :return: Dictionary of session and prefetch counts
+        """
+        return {
+            'active': len(self.sessions),
+            'opened': self.opened_count,
+            'expired': self.expired_count,
+            'evicted': self.evicted_count,
+            'active_prefetches': self.active_prefetches,
+            'prefetch_hits': self.prefetch_hits,
+            'prefetch_misses': self.prefetch_misses,
+            'prefetch_expired': self.prefetch_expired
+        }
@@ -0,0 +1,100 @@
+import unicodedata
+from collections import defaultdict
+
+# Letters that unicode normalisation doesn't split into a plain letter and an accent
+SPECIAL_LETTERS = str.maketrans({'ø': 'o', 'æ': 'ae', 'œ': 'oe', 'ß': 'ss', 'ł': 'l', 'đ': 'd', 'ı': 'i', 'þ': 'th'})
+
+
+def fold_name(name: str) -> str:
+    """
+    Lower case a name, and remove accents and punctuation from it, so 'Ødegaard' matches 'odegaard'
+    :param name: Name to fold
+    :return: Folded name
+    """
+    decomposed_name = unicodedata.normalize('NFKD', name.lower().translate(SPECIAL_LETTERS))
+    folded_name = ''.join(character if character.isalnum() else ' '
+                          for character in decomposed_name if not unicodedata.combining(character))
+    return ' '.join(folded_name.split())
+
+
+def trigrams(name: str) -> set:
+    """
+    Split a folded name into overlapping groups of three characters.
+    The name is padded so the start and end of words count for more
+    :param name: Folded name
+    :return: Set of trigrams
+    """
+    padded_name = '  ' + name + ' '
+    return {padded_name[i:i + 3] for i in range(len(padded_name) - 2)}
+
+
+class PlayerSearchIndex:
+    """
+    Fuzzy index of player names. Each player is findable by their web name, full name and surname,
+    with accents removed. Candidates are found through shared trigrams, then ranked by how similar they are
+    """
+
+    def __init__(self, player_list: list):
+        """
+        Build index of players
+        :param player_list: List of players from the bootstrap data
+        """
+        # Every searchable name, as (player id, folded name, trigrams of name)
+        self.names = []
+        # Maps trigram to the positions of names in self.names that contain it
+        self.trigram_index = defaultdict(list)
+        # Used to break ties, so better known players come first
+        self.player_points = {}
+
+        for player in player_list:
+            self.player_points[player["id"]] = player["total_points"]
+
+            player_names = {fold_name(player["web_name"]),
+                            fold_name(player["second_name"]),
+                            fold_name(player["first_name"] + " " + player["second_name"])}
+
+            for name in player_names:
+                if not name:
+                    continue
+                name_trigrams = trigrams(name)
+                for trigram in name_trigrams:
+                    self.trigram_index[trigram].append(len(self.names))
+                self.names.append((player["id"], name, name_trigrams))
+
+    def search(self, query: str, limit: int = 20, cutoff: float = 0.3) -> list:
+        """
+        Find players with names similar to a query
+        :param query: Name to search for
+        :param limit: Maximum number of players to return
+        :param cutoff: Minimum similarity, between 0 and 1, for a player to be included
+        :return: List of player ids, most similar first
+        """
+        folded_query = fold_name(query)
+        if not folded_query:
+            return []
+        query_trigrams = trigrams(folded_query)
+
+        # Count trigrams shared with each name that has any in common with the query
+        shared_counts = defaultdict(int)
+        for trigram in query_trigrams:
+            for name_position in self.trigram_index.get(trigram, ()):
+                shared_counts[name_position] += 1
+
+        player_scores = {}
+        for name_position, shared_count in shared_counts.items():
+            player_id, name, name_trigrams = self.names[name_position]
+
+            # Dice coefficient of the two trigram sets
+            score = 2 * shared_count / (len(query_trigrams) + len(name_trigrams))
+            if name == folded_query:
+                score += 1
+            elif name.startswith(folded_query) or (' ' + folded_query) in name:
+                score += 0.5
+
+            if score >= cutoff and score > player_scores.get(player_id, 0):
+                player_scores[player_id] = score
+
+        ranked_players = sorted(player_scores,
+                                key=lambda player_id: (player_scores[player_id], self.player_points[player_id]),
+                                reverse=True)
+        return ranked_players[:limit]
@@ -0,0 +1,104 @@
+import numpy as np
+
+
+def to_number(value) -> float:
+    """
+    Convert a stat from the api to a float. Many are sent as strings, e.g. form
+    :param value: Value of stat
+    :return: Value as float, or nan if it isn't a number
+    """
+    if value is None or isinstance(value, bool):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class PlayerTable:
+    """
+    Column based copy of the bootstrap player list, with every numeric stat stored
+    as a numpy array, so players can be filtered and sorted by any stat at once
+    """
+
+    def __init__(self, player_list: list):
+        """
+        Build table from list of players
+        :param player_list: List of players from the bootstrap data
+        """
+        self.player_list = player_list
+        self.ids = np.array([player["id"] for player in player_list], dtype=np.int64)
+        self.teams = np.array([player["team"] for player in player_list], dtype=np.int64)
+        self.positions = np.array([player["element_type"] for player in player_list], dtype=np.int64)
+
+        # Any stat that is a number, or a string holding one, for any player becomes a column,
+        # with nan for players without a value. Stats no player has a value for yet, e.g. penalties_order
+        # early in the season, are columns of nan too, so they can always be queried
+        self.columns = {}
+        stats = dict.fromkeys(key for player in player_list for key in player)
+        for stat in stats:
+            values = [player.get(stat) for player in player_list]
+            column = np.array([to_number(value) for value in values], dtype=np.float64)
+            if not np.isnan(column).all() or all(value is None for value in values):
+                self.columns[stat] = column
+
+    def column(self, stat: str) -> np.ndarray:
+        """
+        Get all players' values of a stat
+        :param stat: Name of stat, as in the api
+        :return: Array of values, in the same order as the player list
+        """
+        return self.columns[stat]
+
+    def filter(self, position: int = None, team: int = None, min_cost: float = None,
+               max_cost: float = None, stat_filters: dict = None) -> np.ndarray:
+        """
+        Find which players meet all conditions given
+        :param position: Position (element type) players must play in
+        :param team: Id of team players must play for
+        :param min_cost: Minimum cost in millions
+        :param max_cost: Maximum cost in millions
+        :param stat_filters: Dictionary mapping stat to (minimum, maximum). Either can be None
+        :return: Boolean array, True for players meeting all conditions
+        """
+        mask = np.ones(len(self.ids), dtype=bool)
+
+        if position is not None:
+            mask &= self.positions == position
+        if team is not None:
+            mask &= self.teams == team
+
+        # Costs are stored in tenths of a million
+        if min_cost is not None:
+            mask &= self.columns["now_cost"] >= min_cost * 10
+        if max_cost is not None:
+            mask &= self.columns["now_cost"] <= max_cost * 10
+
+        for stat, (minimum, maximum) in (stat_filters or {}).items():
+            if minimum is not None:
+                mask &= self.columns[stat] >= minimum
+            if maximum is not None:
+                mask &= self.columns[stat] <= maximum
+
+        return mask
+
+    def top(self, stat: str, limit: int = None, ascending: bool = False, **filters) -> list:
+        """
+        Find the players with the best value of a stat, out of those meeting the filters.
+        Players with equal values keep their order from the player list
+        :param stat: Stat to sort by
+        :param limit: Maximum number of players to return, None for all
+        :param ascending: Sort lowest first instead
+        :param filters: Conditions, as taken by filter
+        :return: List of player dictionaries
+        """
+        positions = np.flatnonzero(self.filter(**filters))
+        values = self.columns[stat][positions]
+
+        # Players without a value for the stat go last
+        values = np.where(np.isnan(values), np.inf, values if ascending else -values)
+        order = positions[np.argsort(values, kind='stable')]
+
+        if limit is not None:
+            order = order[:limit]
+        return [self.player_list[i] for i in order]
@@ -0,0 +1,178 @@
+import numpy as np
+
+# Most players a squad can have from one club
+CLUB_LIMIT = 3
+# Points taken off for each transfer beyond the free ones
+TRANSFER_HIT = 4
+# Ease of a fixture of average difficulty, so projections are in points per average fixture
+AVERAGE_FIXTURE_EASE = 3
+
+
+def projected_points(player_table, fixture_difficulty, team_matches_played: dict,
+                     start_gameweek: int, horizon: int) -> np.ndarray:
+    """
+    Project every player's points over the next few gameweeks, as their form,
+    times the share of their team's minutes they play, times the chance they are fit,
+    times how many average fixtures their team's fixtures are worth. Blank and double gameweeks count as
+    no and two fixtures
+    :param player_table: PlayerTable of all players
+    :param fixture_difficulty: FixtureDifficultyMatrix of all fixtures
+    :param team_matches_played: Dictionary mapping team id to number of matches played so far
+    :param start_gameweek: First gameweek to project
+    :param horizon: Number of gameweeks to project
+    :return: Array of projected points, in the same order as the player table
+    """
+    form = np.nan_to_num(player_table.column("form"))
+    minutes = np.nan_to_num(player_table.column("minutes"))
+
+    matches_played = np.array([team_matches_played.get(team, 0) for team in player_table.teams], dtype=np.float64)
+    minutes_share = np.clip(minutes / np.maximum(matches_played * 90, 1), 0, 1)
+
+    # No chance is given for players without any news, who are fit
+    chance_of_playing = np.nan_to_num(player_table.column("chance_of_playing_next_round"), nan=100) / 100
+
+    team_ease = fixture_difficulty.run_ease(start_gameweek, horizon)
+    team_rows = np.array([fixture_difficulty.team_rows.get(team, -1) for team in player_table.teams], dtype=np.int64)
+    player_ease = np.where(team_rows >= 0, team_ease[team_rows] if len(team_ease) else 0, 0)
+
+    return form * minutes_share * chance_of_playing * player_ease / AVERAGE_FIXTURE_EASE
+
+
+def prune_candidates(candidates: np.ndarray, positions: np.ndarray, costs: np.ndarray,
+                     projections: np.ndarray, depth: int) -> np.ndarray:
+    """
+    Drop players that are never worth buying: those with at least depth players in their position
+    projected to score as much while costing no more. Depth is more than one, so a replacement is left
+    when better players are blocked by the club limit
+    :param candidates: Positions in the player arrays of players that could be bought
+    :param positions: Position of every player
+    :param costs: Cost of every player
+    :param projections: Projected points of every player
+    :param depth: Number of better, cheaper players needed to drop a player
+    :return: Positions in the player arrays of players kept
+    """
+    kept = []
+    for position in np.unique(positions[candidates]):
+        position_candidates = candidates[positions[candidates] == position]
+        # Best first, cheapest first between equals
+        order = position_candidates[np.lexsort((costs[position_candidates], -projections[position_candidates]))]
+
+        kept_costs = []
+        for player in order:
+            if sum(kept_cost <= costs[player] for kept_cost in kept_costs) < depth:
+                kept.append(player)
+                kept_costs.append(costs[player])
+
+    return np.array(sorted(kept), dtype=np.int64)
+
+
+def suggest_transfers(squad_ids: list, bank: int, free_transfers: int, player_ids: np.ndarray,
+                      positions: np.ndarray, teams: np.ndarray, costs: np.ndarray, projections: np.ndarray,
+                      limit: int = 5, prune_depth: int = 4) -> list:
+    """
+    Find the best one and two transfer combinations for a squad. Made to run in another process,
+    so only takes arrays and lists, which are cheap to send.
+    Candidates are pruned first. Two transfer combinations are scored all at once for each pair of players
+    sold, skipping pairs that can't beat the best found so far
+    :param squad_ids: Ids of the 15 players in the squad
+    :param bank: Money in the bank, in tenths of a million
+    :param free_transfers: Number of transfers that don't cost points
+    :param player_ids: Id of every player
+    :param positions: Position of every player
+    :param teams: Team id of every player
+    :param costs: Cost of every player, in tenths of a million. Players are sold for their cost
+    :param projections: Projected points of every player
+    :param limit: Maximum number of suggestions to return
+    :param prune_depth: Depth of candidate pruning, as in prune_candidates
+    :return: List of dictionaries with the ids of players out and in, projected points gained,
+    points hit taken and net points gained, best first. Only suggestions that gain points are included
+    """
+    position_of_id = {int(player_id): i for i, player_id in enumerate(player_ids)}
+    squad = np.array([position_of_id[player_id] for player_id in squad_ids if player_id in position_of_id],
+                     dtype=np.int64)
+
+    in_squad = np.zeros(len(player_ids), dtype=bool)
+    in_squad[squad] = True
+    club_counts = np.bincount(teams[squad], minlength=int(teams.max()) + 1)
+
+    candidates = prune_candidates(np.flatnonzero(~in_squad & (projections > 0)),
+                                  positions, costs, projections, prune_depth)
+    candidate_positions = positions[candidates]
+    candidate_teams = teams[candidates]
+    candidate_costs = costs[candidates]
+    candidate_projections = projections[candidates]
+
+    suggestions = []
+
+    def hit(transfer_count):
+        return TRANSFER_HIT * max(0, transfer_count - free_transfers)
+
+    # One transfer, every player sold against every candidate at once
+    valid = ((candidate_positions[None, :] == positions[squad][:, None]) &
+             (candidate_costs[None, :] <= bank + costs[squad][:, None]) &
+             (club_counts[candidate_teams][None, :] - (candidate_teams[None, :] == teams[squad][:, None]) < CLUB_LIMIT))
+    gains = np.where(valid, candidate_projections[None, :] - projections[squad][:, None], -np.inf)
+
+    for out_slot, in_slot in zip(*np.unravel_index(np.argsort(-gains, axis=None)[:limit], gains.shape)):
+        if gains[out_slot, in_slot] > -np.inf:
+            suggestions.append(([squad[out_slot]], [candidates[in_slot]], gains[out_slot, in_slot], hit(1)))
+
+    # Two transfers. Gains of two transfers only beat the best found if they can beat the limit-th best
+    best_gains = sorted((gain - points_hit for *_, gain, points_hit in suggestions), reverse=True)
+    candidates_by_position = {position: np.flatnonzero(candidate_positions == position)
+                              for position in np.unique(candidate_positions)}
+    best_projection_by_position = {position: candidate_projections[slots].max() if len(slots) else 0
+                                   for position, slots in candidates_by_position.items()}
+
+    for first in range(len(squad)):
+        for second in range(first + 1, len(squad)):
+            first_player, second_player = squad[first], squad[second]
+            first_slots = candidates_by_position.get(positions[first_player], np.array([], dtype=np.int64))
+            second_slots = candidates_by_position.get(positions[second_player], np.array([], dtype=np.int64))
+            if not len(first_slots) or not len(second_slots):
+                continue
+
+            sold_projection = projections[first_player] + projections[second_player]
+            upper_bound = (best_projection_by_position[positions[first_player]] +
+                           best_projection_by_position[positions[second_player]] - sold_projection - hit(2))
+            if len(best_gains) >= limit and upper_bound <= best_gains[limit - 1]:
+                continue
+
+            counts_after_sales = club_counts.copy()
+            counts_after_sales[teams[first_player]] -= 1
+            counts_after_sales[teams[second_player]] -= 1
+
+            first_teams = candidate_teams[first_slots][:, None]
+            second_teams = candidate_teams[second_slots][None, :]
+            same_team = first_teams == second_teams
+
+            valid = ((candidate_costs[first_slots][:, None] + candidate_costs[second_slots][None, :] <=
+                      bank + costs[first_player] + costs[second_player]) &
+                     (counts_after_sales[first_teams] + 1 + same_team <= CLUB_LIMIT) &
+                     (counts_after_sales[second_teams] + 1 + same_team <= CLUB_LIMIT))
+            # The same pair bought the other way round, or the same player twice, isn't a different suggestion
+            if positions[first_player] == positions[second_player]:
+                valid &= first_slots[:, None] < second_slots[None, :]
+
+            gains = np.where(valid, candidate_projections[first_slots][:, None] +
+                             candidate_projections[second_slots][None, :] - sold_projection, -np.inf)
+
+            best = np.unravel_index(np.argmax(gains), gains.shape)
+            gain = gains[best]
+            if gain == -np.inf:
+                continue
+
+            suggestions.append(([first_player, second_player],
+                                [candidates[first_slots[best[0]]], candidates[second_slots[best[1]]]],
+                                gain, hit(2)))
+            best_gains = sorted(best_gains + [gain - hit(2)], reverse=True)[:limit]
+
+    suggestions.sort(key=lambda suggestion: suggestion[2] - suggestion[3], reverse=True)
+
+    return [{
+        'out': [int(player_ids[player]) for player in players_out],
+        'in': [int(player_ids[player]) for player in players_in],
+        'gain': float(gain),
+        'hit': points_hit,
+        'net_gain': float(gain - points_hit)
+    } for players_out, players_in, gain, points_hit in suggestions[:limit] if gain - points_hit > 0]
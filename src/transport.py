@@ -0,0 +1,215 @@
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+
+import aiohttp
+import requests
+
+FPL_API_URL = "https://fantasy.premierleague.com/api"
+
+
+class HttpTransport:
+    """
+    Sends requests to the real fpl api, over keep-alive connection pools.
+    The requests one is used by blocking requests, the aiohttp one is created lazily,
+    as it must be made inside the running event loop
+    """
+
+    def __init__(self, max_connections: int = 10, request_timeout: int = 30):
+        """
+        Initialises new HttpTransport
+        :param max_connections: Maximum number of simultaneous connections to the fpl api, used by async requests
+        :param request_timeout: Number of seconds before an async request is abandoned
+        """
+        self.max_connections = max_connections
+        self.request_timeout = request_timeout
+
+        self.http_session = requests.Session()
+        self.http_session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=max_connections))
+        self.session = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the shared aiohttp session, creating it if it doesn't exist yet.
+        All async requests share its connection pool, limited to max_connections at once
+        :return: The aiohttp session
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self.session
+
+    def get(self, endpoint: str) -> tuple:
+        """
+        Send a request, blocking until the response arrives
+        :param endpoint: endpoint to be attached to api link
+        :return: Tuple of status code and body of response
+        """
+        api_data = self.http_session.get(FPL_API_URL + endpoint)
+        return api_data.status_code, api_data.content
+
+    async def get_async(self, endpoint: str) -> tuple:
+        """
+        Awaitable version of get
+        :param endpoint: endpoint to be attached to api link
+        :return: Tuple of status code and body of response
+        """
+        session = await self.get_session()
+        async with session.get(FPL_API_URL + endpoint) as api_data:
+            return api_data.status, await api_data.read()
+
+    async def close(self):
+        """
+        Close all connections
+        """
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.http_session.close()
+
+
+class RecordingTransport:
+    """
+    Passes requests on to another transport, and appends every response to an archive,
+    one json line each, with the time it was received
+    """
+
+    def __init__(self, archive_path: str, transport=None):
+        """
+        Initialises new RecordingTransport
+        :param archive_path: Path of archive to append to. It is created if it doesn't exist
+        :param transport: Transport to send requests with, a new HttpTransport if not given
+        """
+        self.transport = transport if transport is not None else HttpTransport()
+        self.archive_path = archive_path
+        self.archive = open(archive_path, 'a')
+
+    def record(self, endpoint: str, status: int, content: bytes):
+        """
+        Append a response to the archive
+        :param endpoint: Endpoint of response
+        :param status: Status code of response
+        :param content: Body of response
+        """
+        self.archive.write(json.dumps({'time': time.time(), 'endpoint': endpoint, 'status': status,
+                                       'body': content.decode()}) + '\n')
+        self.archive.flush()
+
+    def get(self, endpoint: str) -> tuple:
+        status, content = self.transport.get(endpoint)
+        self.record(endpoint, status, content)
+        return status, content
+
+    async def get_async(self, endpoint: str) -> tuple:
+        status, content = await self.transport.get_async(endpoint)
+        self.record(endpoint, status, content)
+        return status, content
+
+    async def close(self):
+        await self.transport.close()
+        self.archive.close()
+
+
+class ReplayTransport:
+    """
+    Answers requests from an archive made by RecordingTransport, without any network access.
+    Each endpoint's responses are given in the order they were recorded, repeating the last one once
+    all have been given. Latency and failures can be simulated, from a seeded random generator
+    so runs are repeatable
+    """
+
+    def __init__(self, archive_path: str, latency: float = 0, latency_jitter: float = 0,
+                 failure_rate: float = 0, seed: int = 0):
+        """
+        Initialises new ReplayTransport, loading the whole archive into memory
+        :param archive_path: Path of archive to replay
+        :param latency: Number of seconds each request takes
+        :param latency_jitter: Maximum number of seconds randomly added to the latency of each request
+        :param failure_rate: Fraction of requests, between 0 and 1, that fail with a connection error
+        :param seed: Seed of random generator used for jitter and failures
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+
+        # Maps endpoint to list of (status, body) in the order they were recorded
+        self.responses = defaultdict(list)
+        with open(archive_path) as archive:
+            for line in archive:
+                if line.strip():
+                    response = json.loads(line)
+                    self.responses[response['endpoint']].append((response['status'], response['body'].encode()))
+
+        # Number of times each endpoint has been requested
+        self.request_counts = Counter()
+        # Endpoints requested that aren't in the archive
+        self.missing_endpoints = set()
+
+    def next_response(self, endpoint: str) -> tuple:
+        """
+        Get the response to give to a request
+        :param endpoint: Endpoint requested
+        :return: Tuple of status code and body of response. Endpoints never recorded are not found
+        """
+        responses = self.responses.get(endpoint)
+        position = self.request_counts[endpoint]
+        self.request_counts[endpoint] += 1
+
+        if not responses:
+            self.missing_endpoints.add(endpoint)
+            return 404, b'{"detail":"Not found."}'
+        return responses[min(position, len(responses) - 1)]
+
+    def simulated_latency(self) -> float:
+        return self.latency + self.random.uniform(0, self.latency_jitter)
+
+    def simulated_failure(self) -> bool:
+        return self.random.random() < self.failure_rate
+
+    def get(self, endpoint: str) -> tuple:
+        latency = self.simulated_latency()
+        if latency:
+            time.sleep(latency)
+        if self.simulated_failure():
+            raise requests.ConnectionError(f"Simulated failure of {endpoint}")
+        return self.next_response(endpoint)
+
+    async def get_async(self, endpoint: str) -> tuple:
+        latency = self.simulated_latency()
+        if latency:
+            await asyncio.sleep(latency)
+        if self.simulated_failure():
+            raise aiohttp.ClientConnectionError(f"Simulated failure of {endpoint}")
+        return self.next_response(endpoint)
+
+    async def close(self):
+        pass
+
+
+def transport_from_environment():
+    """
+    Make the transport chosen by environment variables, so it can be picked when starting the bot:
+        FPL_TRANSPORT: 'http' (default), 'record' or 'replay'
+        FPL_ARCHIVE: Path of archive to record to or replay from, 'fpl_archive.jsonl' by default
+        FPL_REPLAY_LATENCY, FPL_REPLAY_LATENCY_JITTER, FPL_REPLAY_FAILURE_RATE, FPL_REPLAY_SEED:
+            Simulated latency and failures when replaying
+    :return: Transport, or None to use the default HttpTransport
+    """
+    transport_mode = os.environ.get('FPL_TRANSPORT', 'http')
+    archive_path = os.environ.get('FPL_ARCHIVE', 'fpl_archive.jsonl')
+
+    if transport_mode == 'record':
+        return RecordingTransport(archive_path)
+    if transport_mode == 'replay':
+        return ReplayTransport(archive_path,
+                               latency=float(os.environ.get('FPL_REPLAY_LATENCY', 0)),
+                               latency_jitter=float(os.environ.get('FPL_REPLAY_LATENCY_JITTER', 0)),
+                               failure_rate=float(os.environ.get('FPL_REPLAY_FAILURE_RATE', 0)),
+                               seed=int(os.environ.get('FPL_REPLAY_SEED', 0)))
+    if transport_mode != 'http':
+        raise ValueError(f"Unknown FPL_TRANSPORT {transport_mode}, expected 'http', 'record' or 'replay'")
+    return None
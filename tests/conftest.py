@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The bot's modules live in src, and are imported by name like the bot does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
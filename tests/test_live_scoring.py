@@ -0,0 +1,117 @@
+from live_scoring import LiveScorer, GOALKEEPER, DEFENDER, MIDFIELDER, FORWARD
+
+# Picks in squad order: starting eleven in a 4-3-3, then the bench goalkeeper and three outfield players
+FOUR_THREE_THREE = [GOALKEEPER, DEFENDER, DEFENDER, DEFENDER, DEFENDER, MIDFIELDER, MIDFIELDER, MIDFIELDER,
+                    FORWARD, FORWARD, FORWARD, GOALKEEPER, MIDFIELDER, DEFENDER, FORWARD]
+THREE_FOUR_THREE = [GOALKEEPER, DEFENDER, DEFENDER, DEFENDER, MIDFIELDER, MIDFIELDER, MIDFIELDER, MIDFIELDER,
+                    FORWARD, FORWARD, FORWARD, GOALKEEPER, MIDFIELDER, DEFENDER, FORWARD]
+
+
+def make_scorer(positions, missed=(), unfinished=()):
+    """
+    Make a scorer for a squad of players with ids 1 to 15, each in their own team.
+    Every player scores their id in points
+    :param positions: Position of each player, in squad order
+    :param missed: Ids of players who didn't play
+    :param unfinished: Ids of players whose match hasn't finished
+    :return: LiveScorer for the squad
+    """
+    player_list = [{"id": player_id, "element_type": position, "team": player_id}
+                   for player_id, position in enumerate(positions, start=1)]
+    gameweek_data = {"elements": [{"id": player_id,
+                                   "stats": {"total_points": 0 if player_id in missed else player_id,
+                                             "minutes": 0 if player_id in missed else 90}}
+                                  for player_id in range(1, len(positions) + 1)]}
+    fixtures = [{"team_h": player_id, "team_a": 100, "finished": player_id not in unfinished}
+                for player_id in range(1, len(positions) + 1)]
+    return LiveScorer(gameweek_data, player_list, fixtures)
+
+
+def make_team(captain=9, vice_captain=10, chip=None, transfer_cost=0):
+    return {"picks": [{"element": player_id, "is_captain": player_id == captain,
+                       "is_vice_captain": player_id == vice_captain} for player_id in range(1, 16)],
+            "active_chip": chip,
+            "entry_history": {"event_transfers_cost": transfer_cost}}
+
+
+def test_no_substitutions():
+    score, = make_scorer(FOUR_THREE_THREE).score([make_team(transfer_cost=4)])
+
+    assert score['counted'] == list(range(1, 12))
+    assert score['captain'] == 9
+    assert score['points'] == sum(range(1, 12)) + 9
+    assert score['total'] == score['points'] - 4
+
+
+def test_goalkeeper_substitution():
+    score, = make_scorer(FOUR_THREE_THREE, missed={1}).score([make_team()])
+
+    # Only the bench goalkeeper can replace the goalkeeper, even though an outfield player is first on the bench
+    assert score['counted'] == list(range(2, 13))
+    assert score['points'] == sum(range(2, 13)) + 9
+
+
+def test_substitution_blocked_by_formation():
+    score, = make_scorer(THREE_FOUR_THREE, missed={2}).score([make_team()])
+
+    # The midfielder first on the bench would leave two defenders, so the defender after them comes on
+    assert score['counted'] == [1] + list(range(3, 12)) + [14]
+    assert score['points'] == 1 + sum(range(3, 12)) + 14 + 9
+
+
+def test_no_substitution_before_match_finishes():
+    score, = make_scorer(FOUR_THREE_THREE, missed={2}, unfinished={2}).score([make_team()])
+
+    assert score['counted'] == list(range(1, 12))
+
+
+def test_captain_substituted_for_vice_captain():
+    score, = make_scorer(FOUR_THREE_THREE, missed={9}).score([make_team()])
+
+    assert score['counted'] == [player_id for player_id in range(1, 12) if player_id != 9] + [13]
+    assert score['captain'] == 10
+    assert score['points'] == sum(range(1, 12)) - 9 + 13 + 10
+
+
+def test_captain_and_vice_captain_missed():
+    score, = make_scorer(FOUR_THREE_THREE, missed={9, 10}).score([make_team()])
+
+    # Nobody is doubled
+    assert score['counted'] == [player_id for player_id in range(1, 12) if player_id not in (9, 10)] + [13, 14]
+    assert score['points'] == sum(range(1, 12)) - 9 - 10 + 13 + 14
+
+
+def test_bench_boost():
+    score, = make_scorer(FOUR_THREE_THREE, missed={2}).score([make_team(chip='bboost')])
+
+    # Everyone counts, so no substitutions are made
+    assert score['counted'] == list(range(1, 16))
+    assert score['points'] == sum(range(1, 16)) - 2 + 9
+
+
+def test_triple_captain():
+    score, = make_scorer(FOUR_THREE_THREE).score([make_team(chip='3xc')])
+
+    assert score['points'] == sum(range(1, 12)) + 2 * 9
+
+
+def test_triple_captain_passes_to_vice_captain():
+    score, = make_scorer(FOUR_THREE_THREE, missed={9}).score([make_team(chip='3xc')])
+
+    assert score['captain'] == 10
+    assert score['points'] == sum(range(1, 12)) - 9 + 13 + 2 * 10
+
+
+def test_teams_scored_together_match_teams_scored_alone():
+    scorer = make_scorer(FOUR_THREE_THREE, missed={1, 2, 9})
+    teams = [make_team(), make_team(chip='bboost'), make_team(chip='3xc'), make_team(captain=5, vice_captain=6)]
+
+    assert scorer.score(teams) == [scorer.score([team])[0] for team in teams]
+
+
+def test_errored_live_data():
+    player_list = [{"id": player_id, "element_type": position, "team": player_id}
+                   for player_id, position in enumerate(FOUR_THREE_THREE, start=1)]
+    score, = LiveScorer({"detail": "Not found."}, player_list, []).score([make_team()])
+
+    assert score['points'] == 0
@@ -0,0 +1,78 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from live_scoring import GOALKEEPER, DEFENDER, MIDFIELDER, FORWARD
+from transfer_suggestions import suggest_transfers, CLUB_LIMIT, TRANSFER_HIT
+
+SQUAD_POSITIONS = [GOALKEEPER] * 2 + [DEFENDER] * 5 + [MIDFIELDER] * 5 + [FORWARD] * 3
+
+
+def make_players(seed, player_count=40, club_count=8):
+    """
+    Make random players, with the first 15 making up a valid squad
+    :return: Tuple of player ids, positions, teams, costs and projections
+    """
+    rng = np.random.default_rng(seed)
+    player_ids = np.arange(1, player_count + 1, dtype=np.int64) * 10
+    positions = np.concatenate([SQUAD_POSITIONS, rng.integers(GOALKEEPER, FORWARD + 1, player_count - 15)])
+    teams = np.concatenate([np.arange(15) % club_count + 1, rng.integers(1, club_count + 1, player_count - 15)])
+    costs = rng.integers(40, 120, player_count)
+    projections = np.round(rng.uniform(0, 10, player_count), 2)
+    return player_ids, positions, teams, costs, projections
+
+
+def brute_force_best(squad, bank, free_transfers, positions, teams, costs, projections):
+    """
+    Find the best net gain of one or two transfers by trying every one
+    """
+    others = [player for player in range(len(positions)) if player not in squad]
+    best = 0
+    for transfer_count in (1, 2):
+        hit = TRANSFER_HIT * max(0, transfer_count - free_transfers)
+        for players_out in itertools.combinations(squad, transfer_count):
+            for players_in in itertools.permutations(others, transfer_count):
+                if any(positions[out] != positions[bought] for out, bought in zip(players_out, players_in)):
+                    continue
+                if costs[list(players_in)].sum() > bank + costs[list(players_out)].sum():
+                    continue
+                new_squad = [player for player in squad if player not in players_out] + list(players_in)
+                if np.bincount(teams[new_squad]).max() > CLUB_LIMIT:
+                    continue
+                best = max(best, projections[list(players_in)].sum() - projections[list(players_out)].sum() - hit)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("free_transfers", [0, 1, 2])
+def test_best_suggestion_matches_brute_force(seed, free_transfers):
+    player_ids, positions, teams, costs, projections = make_players(seed)
+    squad = list(range(15))
+    bank = 10
+
+    suggestions = suggest_transfers([int(player_ids[player]) for player in squad], bank, free_transfers,
+                                    player_ids, positions, teams, costs, projections)
+    best = brute_force_best(squad, bank, free_transfers, positions, teams, costs, projections)
+
+    if best > 0:
+        assert suggestions[0]['net_gain'] == pytest.approx(best)
+    else:
+        assert suggestions == []
+
+
+def test_suggestions_are_valid():
+    player_ids, positions, teams, costs, projections = make_players(0)
+    squad_ids = [int(player_id) for player_id in player_ids[:15]]
+    position_of_id = {int(player_id): i for i, player_id in enumerate(player_ids)}
+
+    for suggestion in suggest_transfers(squad_ids, 10, 1, player_ids, positions, teams, costs, projections):
+        players_out = [position_of_id[player_id] for player_id in suggestion['out']]
+        players_in = [position_of_id[player_id] for player_id in suggestion['in']]
+        new_squad = [position_of_id[player_id] for player_id in squad_ids if player_id not in suggestion['out']]
+        new_squad += players_in
+
+        assert sorted(positions[players_out]) == sorted(positions[players_in])
+        assert costs[players_in].sum() <= 10 + costs[players_out].sum()
+        assert np.bincount(teams[new_squad]).max() <= CLUB_LIMIT
+        assert not set(squad_ids) & set(suggestion['in'])